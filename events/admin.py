@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from .models import Event, EventPhoto
+from yearbook.renditions import rendition_url
 
 class EventPhotoInline(admin.TabularInline):
     model = EventPhoto
@@ -12,7 +13,7 @@ class EventPhotoInline(admin.TabularInline):
         if obj.image:
             return format_html(
                 '<img src="{}" style="max-height: 100px;" />',
-                obj.image.url
+                rendition_url(obj.image.name, 'thumb')
             )
         return "No Image"
     preview_image.short_description = 'Preview'
@@ -23,13 +24,13 @@ class EventAdmin(admin.ModelAdmin):
     list_filter = ('is_approved', 'category', 'date')
     search_fields = ('title', 'description', 'location')
     inlines = [EventPhotoInline]
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('created_at', 'updated_at', 'photos_count', 'approved_photos_count')
     fieldsets = (
         (None, {
             'fields': ('title', 'slug', 'description', 'category')
         }),
         ('Details', {
-            'fields': ('date', 'location', 'attendees_count', 'photos_count')
+            'fields': ('date', 'location', 'attendees_count', 'photos_count', 'approved_photos_count')
         }),
         ('Media', {
             'fields': ('cover_image', 'highlights')
@@ -51,7 +52,7 @@ class EventPhotoAdmin(admin.ModelAdmin):
         if obj.image:
             return format_html(
                 '<img src="{}" style="max-height: 50px;" />',
-                obj.image.url
+                rendition_url(obj.image.name, 'thumb')
             )
         return "No Image"
     preview_image.short_description = 'Preview'
@@ -0,0 +1,131 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import models
+
+from yearbook.media_cleanup import delete_file
+from yearbook.renditions import ROOT as RENDITIONS_ROOT
+from yearbook.storage import BLOB_DIR
+
+
+def referenced_names():
+    """Every storage name held by a FileField of any installed model."""
+    names = set()
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if isinstance(field, models.FileField):
+                names.update(
+                    model._default_manager.exclude(**{field.attname: ''})
+                    .exclude(**{f'{field.attname}__isnull': True})
+                    .values_list(field.attname, flat=True)
+                    .distinct()
+                )
+    return names
+
+
+def scan_directory(path):
+    """List one directory: (files as (path, size, mtime, links), subdirectories)."""
+    files, subdirs = [], []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                stat = entry.stat(follow_symlinks=False)
+                files.append((entry.path, stat.st_size, stat.st_mtime, stat.st_nlink))
+    return files, subdirs
+
+
+class Command(BaseCommand):
+    help = 'Find (and optionally delete) files under MEDIA_ROOT that no database row references'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--delete',
+            action='store_true',
+            help='Delete the orphaned files instead of only reporting them',
+        )
+        parser.add_argument(
+            '--min-age',
+            type=float,
+            default=24,
+            help='Ignore files modified less than this many hours ago (default 24)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=8,
+            help='Number of directories scanned in parallel',
+        )
+
+    def handle(self, *args, **options):
+        root = settings.MEDIA_ROOT
+        if not os.path.isdir(root):
+            self.stdout.write(self.style.WARNING(f'{root} does not exist'))
+            return
+
+        referenced = referenced_names()
+        cutoff = time.time() - options['min_age'] * 3600
+
+        orphans = []
+        with ThreadPoolExecutor(max_workers=max(options['workers'], 1)) as executor:
+            # Walk the tree breadth-first, one directory listing per task
+            pending = {executor.submit(scan_directory, root)}
+            scanned = 0
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    files, subdirs = future.result()
+                    pending.update(executor.submit(scan_directory, path) for path in subdirs)
+                    for path, size, mtime, links in files:
+                        scanned += 1
+                        if mtime > cutoff:
+                            continue  # May belong to an upload that hasn't committed yet
+                        name = os.path.relpath(path, root).replace(os.sep, '/')
+                        if self.is_orphan(name, links, referenced):
+                            orphans.append((name, size))
+
+            orphans.sort()
+            for name, size in orphans:
+                self.stdout.write(f'{name} ({size} bytes)')
+
+            total = sum(size for _, size in orphans)
+            if not options['delete']:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Scanned {scanned} files: {len(orphans)} orphaned, {total} bytes'
+                ))
+                return
+
+            failures = sum(1 for ok in executor.map(self.remove, [name for name, _ in orphans]) if not ok)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Scanned {scanned} files: deleted {len(orphans) - failures} orphaned files, {total} bytes'
+        ))
+        if failures:
+            self.stdout.write(self.style.WARNING(f'{failures} files could not be deleted'))
+
+    @staticmethod
+    def is_orphan(name, links, referenced):
+        if name.startswith(f'{BLOB_DIR}/'):
+            # Only the blob itself is left
+            return links == 1
+        if name.startswith(f'{RENDITIONS_ROOT}/'):
+            # renditions/<rendition>/<source path>.<ext>
+            source = name.split('/', 2)[-1]
+            return os.path.splitext(source)[0] not in referenced
+        return name not in referenced
+
+    def remove(self, name):
+        try:
+            if name.startswith(f'{BLOB_DIR}/'):
+                os.remove(os.path.join(settings.MEDIA_ROOT, name))
+            else:
+                delete_file(name)
+        except OSError as e:
+            self.stderr.write(f'Could not delete {name}: {e}')
+            return False
+        return True
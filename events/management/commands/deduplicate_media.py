@@ -0,0 +1,64 @@
+import os
+
+from django.core.files.storage import storages
+from django.core.management.base import BaseCommand, CommandError
+
+from events.models import EventPhoto
+from yearbook.storage import BLOB_DIR, DeduplicatingFileSystemStorage, file_hash
+
+
+class Command(BaseCommand):
+    help = 'Store identical files under MEDIA_ROOT once and backfill EventPhoto.content_hash'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how much space duplicates take',
+        )
+
+    def handle(self, *args, **options):
+        storage = storages['default']
+        if not isinstance(storage, DeduplicatingFileSystemStorage):
+            raise CommandError('The default storage does not deduplicate files')
+
+        dry_run = options['dry_run']
+        hashes = {}
+        seen = {}
+        files = duplicates = reclaimed = 0
+
+        for root, dirs, names in os.walk(storage.location):
+            if root == storage.location:
+                dirs[:] = [d for d in dirs if d != BLOB_DIR]
+            for filename in names:
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, storage.location).replace(os.sep, '/')
+                digest = file_hash(path)
+                hashes[name] = digest
+                files += 1
+
+                stat = os.stat(path)
+                inode = (stat.st_dev, stat.st_ino)
+                first = seen.setdefault(digest, inode)
+                if first != inode:
+                    duplicates += 1
+                    if dry_run:
+                        reclaimed += stat.st_size
+                        continue
+                if not dry_run:
+                    reclaimed += storage.adopt(name, digest)
+
+        photos = []
+        for photo in EventPhoto.objects.filter(content_hash='').only('id', 'image').iterator():
+            digest = hashes.get(photo.image.name)
+            if digest:
+                photo.content_hash = digest
+                photos.append(photo)
+        if photos and not dry_run:
+            EventPhoto.objects.bulk_update(photos, ['content_hash'], batch_size=500)
+
+        verb = 'Would reclaim' if dry_run else 'Reclaimed'
+        self.stdout.write(self.style.SUCCESS(
+            f'Scanned {files} files, {duplicates} duplicates. {verb} {reclaimed} bytes; '
+            f'hashed {len(photos)} event photos'
+        ))
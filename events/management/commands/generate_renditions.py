@@ -0,0 +1,65 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from events.models import Event, EventPhoto
+from yearbook import renditions
+
+
+def image_sources():
+    """Yield (label, queryset, field name) for every uploaded image that has renditions."""
+    yield 'event photos', EventPhoto.objects.exclude(image=''), 'image'
+    yield 'event covers', Event.objects.exclude(cover_image='').exclude(cover_image__isnull=True), 'cover_image'
+    if apps.is_installed('memories'):
+        from memories.models import Memory
+        yield 'memories', Memory.objects.exclude(image='').exclude(image__isnull=True), 'image'
+
+
+class Command(BaseCommand):
+    help = 'Precompute the image renditions (thumb, medium, webp) of uploaded photos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rendition',
+            action='append',
+            choices=list(renditions.get_renditions()),
+            help='Only generate this rendition (repeatable); defaults to all',
+        )
+        parser.add_argument(
+            '--overwrite',
+            action='store_true',
+            help='Regenerate renditions that already exist',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Number of images rendered in parallel',
+        )
+
+    def handle(self, *args, **options):
+        names = options['rendition'] or list(renditions.get_renditions())
+        overwrite = options['overwrite']
+
+        def render(source_name):
+            try:
+                for name in names:
+                    renditions.generate(source_name, name, overwrite=overwrite)
+            except renditions.RenditionError as exc:
+                return str(exc)
+            return None
+
+        with ThreadPoolExecutor(max_workers=max(options['workers'], 1)) as executor:
+            for label, queryset, field_name in image_sources():
+                sources = queryset.values_list(field_name, flat=True).distinct().iterator()
+                done = failed = 0
+                for error in executor.map(render, sources):
+                    if error:
+                        self.stderr.write(error)
+                        failed += 1
+                    else:
+                        done += 1
+                self.stdout.write(self.style.SUCCESS(f'Rendered {done} {label}'))
+                if failed:
+                    self.stdout.write(self.style.WARNING(f'{failed} {label} could not be rendered'))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q
+
+from events.models import Event
+
+
+class Command(BaseCommand):
+    help = 'Recompute Event.photos_count and approved_photos_count and fix any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report events whose stored counts are wrong',
+        )
+
+    def handle(self, *args, **options):
+        drifted = []
+        events = Event.objects.annotate(
+            total=Count('photo'),
+            approved=Count('photo', filter=Q(photo__is_approved=True)),
+        ).only('id', 'photos_count', 'approved_photos_count')
+        for event in events.iterator():
+            if (event.photos_count, event.approved_photos_count) != (event.total, event.approved):
+                self.stdout.write(
+                    f'Event {event.id}: stored {event.photos_count}/{event.approved_photos_count}, '
+                    f'actual {event.total}/{event.approved}'
+                )
+                event.photos_count = event.total
+                event.approved_photos_count = event.approved
+                drifted.append(event)
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('All photo counts are in sync'))
+            return
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'{len(drifted)} events have drifted'))
+            return
+
+        with transaction.atomic():
+            Event.objects.bulk_update(drifted, ['photos_count', 'approved_photos_count'], batch_size=500)
+        self.stdout.write(self.style.SUCCESS(f'Fixed photo counts for {len(drifted)} events'))
@@ -0,0 +1,106 @@
+import os
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from events.models import Event, EventPhoto, event_image_path
+
+
+def expected_name(instance, name, prefix):
+    """Return where `name` belongs now, or None if it is already there."""
+    basename = os.path.basename(name)
+    if prefix and basename.startswith(prefix):
+        basename = basename[len(prefix):]
+    target = event_image_path(instance, basename)
+    return None if target == name else target
+
+
+class Command(BaseCommand):
+    help = 'Move event photos and covers left in event_None/event_unknown to their final paths'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report the files that would be moved',
+        )
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        self.moved = {}
+        self.locations = {}
+        self.missing = 0
+
+        photos = self.relocate(
+            EventPhoto.objects.exclude(image='').only('id', 'event_id', 'image'),
+            'image',
+            lambda photo: f'event_{photo.event_id}_',
+        )
+        covers = self.relocate(
+            Event.objects.exclude(cover_image='').exclude(cover_image__isnull=True).only('id', 'cover_image'),
+            'cover_image',
+            lambda event: 'cover_',
+        )
+
+        verb = 'Would relocate' if self.dry_run else 'Relocated'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {photos} photos and {covers} cover images ({len(self.moved)} files)'
+        ))
+        if self.missing:
+            self.stdout.write(self.style.WARNING(f'{self.missing} files were missing from storage'))
+
+    def relocate(self, queryset, field_name, prefix_for):
+        changed = []
+        for instance in queryset.iterator():
+            field = getattr(instance, field_name)
+            target = expected_name(instance, field.name, prefix_for(instance))
+            if target is None:
+                continue
+
+            new_name = self.move(field.name, target)
+            if new_name is None:
+                continue
+            self.stdout.write(f'{field.name} -> {new_name}')
+            field.name = new_name
+            changed.append(instance)
+
+        if changed and not self.dry_run:
+            with transaction.atomic():
+                queryset.model.objects.bulk_update(changed, [field_name], batch_size=500)
+        return len(changed)
+
+    def move(self, old_name, target):
+        # Several rows may point at the same file. Rows of one event share the
+        # moved file; rows of another event get a copy under their own event
+        key = (old_name, target)
+        if key in self.moved:
+            return self.moved[key]
+        # Where the file is now, if a row of another event already moved it
+        current = self.locations.get(old_name)
+        if current is None and not default_storage.exists(old_name):
+            self.stderr.write(f'Missing file: {old_name}')
+            self.missing += 1
+            return None
+
+        if self.dry_run:
+            new_name = target
+        elif current is not None:
+            with default_storage.open(current, 'rb') as source:
+                new_name = default_storage.save(target, source)
+        else:
+            new_name = default_storage.get_available_name(target)
+            try:
+                old_path, new_path = default_storage.path(old_name), default_storage.path(new_name)
+            except NotImplementedError:
+                # Remote storage: copy then delete
+                with default_storage.open(old_name, 'rb') as source:
+                    new_name = default_storage.save(new_name, source)
+                default_storage.delete(old_name)
+            else:
+                os.makedirs(os.path.dirname(new_path), exist_ok=True)
+                os.rename(old_path, new_path)
+
+        self.moved[key] = new_name
+        self.locations.setdefault(old_name, new_name)
+        return new_name
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:16
+
+import django.core.validators
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_photo_counts(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    EventPhoto = apps.get_model('events', 'EventPhoto')
+
+    def counts(**filters):
+        return (
+            EventPhoto.objects.filter(event_id=OuterRef('pk'), **filters)
+            .values('event_id')
+            .annotate(total=Count('id'))
+            .values('total')
+        )
+
+    Event.objects.update(
+        photos_count=Coalesce(Subquery(counts()), 0),
+        approved_photos_count=Coalesce(Subquery(counts(is_approved=True)), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='approved_photos_count',
+            field=models.PositiveIntegerField(default=0, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.RunPython(backfill_photo_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0002_event_approved_photos_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventphoto',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='eventphoto',
+            index=models.Index(fields=['event', 'content_hash'], name='eventphoto_event_hash_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0003_eventphoto_content_hash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='eventphoto',
+            index=models.Index(condition=models.Q(('is_approved', True)), fields=['event', 'uploaded_at'], name='eventphoto_gallery_idx'),
+        ),
+    ]
@@ -1,14 +1,21 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils.text import slugify
-import os
+
+from yearbook.storage import content_hash
 
 def event_image_path(instance, filename):
-    # File will be uploaded to MEDIA_ROOT/events/event_<event_id>/<filename>
-    if hasattr(instance, 'event') and instance.event_id:
-        return f'events/event_{instance.event_id}/{filename}'
+    # Photos go to MEDIA_ROOT/events/event_<event_id>/event_<event_id>_<filename>
+    event_id = getattr(instance, 'event_id', None)
+    if event_id:
+        return f'events/event_{event_id}/event_{event_id}_{filename}'
+    # Cover images go next to their event's photos once the event exists
+    if isinstance(instance, Event) and instance.pk:
+        return f'events/event_{instance.pk}/cover_{filename}'
+    if isinstance(instance, Event):
+        return f'events/covers/{filename}'
     return f'events/event_unknown/{filename}'
 
 class Event(models.Model):
@@ -26,6 +33,7 @@ class Event(models.Model):
     description = models.TextField()
     attendees_count = models.PositiveIntegerField(default=0, validators=[MinValueValidator(0)])
     photos_count = models.PositiveIntegerField(default=0, validators=[MinValueValidator(0)])
+    approved_photos_count = models.PositiveIntegerField(default=0, validators=[MinValueValidator(0)])
     highlights = models.JSONField(default=list, help_text="List of event highlights")
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
     cover_image = models.ImageField(upload_to=event_image_path, null=True, blank=True)
@@ -47,14 +55,42 @@ class Event(models.Model):
     def __str__(self):
         return f"{self.title} ({self.get_category_display()}) - {self.date}"
     
+    # Maintained with F() updates by the EventPhoto signals
+    COUNTER_FIELDS = ('photos_count', 'approved_photos_count')
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored slug so a rename can drop its cached lookup
+        instance._stored_slug = instance.__dict__.get('slug')
+        return instance
+    
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = f"{slugify(self.title)}-{timezone.now().strftime('%Y%m%d%H%M%S')}"
-        super().save(*args, **kwargs)
         
-        # Update photos count
-        self.photos_count = self.photos.count()
-        super().save(update_fields=['photos_count'])
+        # Never write back possibly stale counters on a full update
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+    
+    @classmethod
+    def adjust_photo_counts(cls, event_id, total=0, approved=0):
+        """Atomically shift the photo counters of an event."""
+        if not (total or approved):
+            return
+        cls.objects.filter(pk=event_id).update(
+            photos_count=models.F('photos_count') + total,
+            approved_photos_count=models.F('approved_photos_count') + approved,
+        )
+        if approved:
+            # The cached timeline shows approved photo counts, and update()
+            # sends no post_save for the Event signals to drop it
+            from .timeline import invalidate
+            transaction.on_commit(invalidate)
 
 
 class EventPhoto(models.Model):
@@ -74,18 +110,35 @@ class EventPhoto(models.Model):
     )
     uploaded_at = models.DateTimeField(auto_now_add=True)
     is_approved = models.BooleanField(default=False)
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
     
     class Meta:
         ordering = ['-uploaded_at']
         verbose_name = 'Event Photo'
         verbose_name_plural = 'Event Photos'
+        indexes = [
+            models.Index(fields=['event', 'content_hash'], name='eventphoto_event_hash_idx'),
+            # Serves the nested gallery: one event's approved photos, newest first
+            models.Index(
+                fields=['event', 'uploaded_at'],
+                condition=models.Q(is_approved=True),
+                name='eventphoto_gallery_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"Photo for {self.event.title} - {self.uploaded_at.strftime('%Y-%m-%d %H:%M')}"
     
-    def delete(self, *args, **kwargs):
-        # Delete the image file when the photo is deleted
-        if self.image:
-            if os.path.isfile(self.image.path):
-                os.remove(self.image.path)
-        super().delete(*args, **kwargs)
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored state so the counter signals can tell what changed
+        instance._stored_event_id = instance.__dict__.get('event_id')
+        instance._stored_is_approved = instance.__dict__.get('is_approved')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        # Hash new uploads; the storage reuses the digest to deduplicate them
+        if self.image and not self.image._committed:
+            self.content_hash = content_hash(self.image.file)
+        super().save(*args, **kwargs)
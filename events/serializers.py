@@ -1,9 +1,13 @@
 from rest_framework import serializers
 from .models import Event, EventPhoto
+from .uploads import get_config as get_upload_config
 from users.serializers import UserSerializer
+from yearbook.renditions import rendition_urls
+from yearbook.serializers import BulkModerationSerializer
 
 class EventPhotoSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    image_renditions = serializers.SerializerMethodField()
     uploaded_by = UserSerializer(read_only=True)
 
     class Meta:
@@ -12,6 +16,7 @@ class EventPhotoSerializer(serializers.ModelSerializer):
             'id',
             'image',
             'image_url',
+            'image_renditions',
             'caption',
             'uploaded_by',
             'uploaded_at',
@@ -23,11 +28,15 @@ class EventPhotoSerializer(serializers.ModelSerializer):
         if obj.image:
             return self.context['request'].build_absolute_uri(obj.image.url)
         return None
+    
+    def get_image_renditions(self, obj):
+        return rendition_urls(obj.image, self.context['request'])
 
 class EventSerializer(serializers.ModelSerializer):
     created_by = UserSerializer(read_only=True)
     photos = EventPhotoSerializer(many=True, read_only=True)
     cover_image_url = serializers.SerializerMethodField()
+    cover_image_renditions = serializers.SerializerMethodField()
     category_display = serializers.CharField(source='get_category_display', read_only=True)
     
     class Meta:
@@ -41,29 +50,64 @@ class EventSerializer(serializers.ModelSerializer):
             'description',
             'attendees_count',
             'photos_count',
+            'approved_photos_count',
             'highlights',
             'category',
             'category_display',
             'cover_image',
             'cover_image_url',
+            'cover_image_renditions',
             'created_by',
             'created_at',
             'updated_at',
             'is_approved',
             'photos',  # Nested photos
         ]
-        read_only_fields = ['slug', 'created_by', 'created_at', 'updated_at', 'photos_count', 'is_approved']
+        read_only_fields = ['slug', 'created_by', 'created_at', 'updated_at', 'photos_count', 'approved_photos_count', 'is_approved']
     
     def get_cover_image_url(self, obj):
         if obj.cover_image:
             return self.context['request'].build_absolute_uri(obj.cover_image.url)
         return None
     
+    def get_cover_image_renditions(self, obj):
+        return rendition_urls(obj.cover_image, self.context['request'])
+    
     def create(self, validated_data):
         # Set the created_by user from the request
         validated_data['created_by'] = self.context['request'].user
         return super().create(validated_data)
 
+class EventPhotoPreviewSerializer(serializers.ModelSerializer):
+    """Minimal photo representation used for event list previews."""
+    image_url = serializers.SerializerMethodField()
+    image_renditions = serializers.SerializerMethodField()
+
+    class Meta:
+        model = EventPhoto
+        fields = ['id', 'image_url', 'image_renditions', 'caption']
+    
+    def get_image_url(self, obj):
+        if obj.image:
+            return self.context['request'].build_absolute_uri(obj.image.url)
+        return None
+    
+    def get_image_renditions(self, obj):
+        return rendition_urls(obj.image, self.context['request'])
+
+class EventListSerializer(EventSerializer):
+    """
+    Event representation for list pages: the cover image, the photo count
+    and a few preview photos instead of the whole gallery, which is served
+    by the nested photos endpoint.
+    """
+    PREVIEW_PHOTOS = 4
+
+    preview_photos = EventPhotoPreviewSerializer(many=True, read_only=True)
+
+    class Meta(EventSerializer.Meta):
+        fields = [f for f in EventSerializer.Meta.fields if f != 'photos'] + ['preview_photos']
+
 class EventCreateSerializer(EventSerializer):
     """Serializer for creating events with additional validation"""
     class Meta(EventSerializer.Meta):
@@ -76,3 +120,37 @@ class EventCreateSerializer(EventSerializer):
         if len(value) > 10:  # Limit number of highlights
             raise serializers.ValidationError("Maximum 10 highlights allowed")
         return value
+
+class EventPhotoBulkUploadSerializer(serializers.Serializer):
+    """
+    Validates a multi-file upload. Files are only checked here; decoding
+    happens on the upload worker pool in events.uploads.
+    """
+    images = serializers.ListField(child=serializers.FileField(), allow_empty=False)
+    caption = serializers.CharField(max_length=255, required=False, allow_blank=True, default='')
+
+    def validate_images(self, value):
+        max_files = get_upload_config()['MAX_FILES']
+        if len(value) > max_files:
+            raise serializers.ValidationError(f"Maximum {max_files} images per upload")
+        return value
+
+class BulkPhotoModerationSerializer(BulkModerationSerializer):
+    """
+    Bulk photo moderation for a list of IDs, or for every pending photo of
+    one event when `event` is given instead.
+    """
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=1000,
+        required=False,
+    )
+    event = serializers.IntegerField(min_value=1, required=False)
+
+    def validate(self, attrs):
+        if not attrs.get('ids') and not attrs.get('event'):
+            raise serializers.ValidationError('Provide either "ids" or "event".')
+        if attrs.get('ids') and attrs.get('event'):
+            raise serializers.ValidationError('Provide only one of "ids" and "event".')
+        return attrs
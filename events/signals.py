@@ -0,0 +1,128 @@
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from yearbook.conditional import bump_version
+from yearbook.media_cleanup import file_names, schedule_delete
+
+from . import slugs, timeline
+from .models import Event, EventPhoto
+
+_batch = threading.local()
+
+
+@contextmanager
+def batched_upkeep():
+    """
+    Collect the photo counter changes and events version bumps made by the
+    handlers below and apply them once, per event, when the block exits.
+    Wrap set-based deletes in it: Django still sends post_delete for every
+    row, so all upkeep stays in this module, but a thousand photos cost one
+    counter UPDATE per event instead of one per photo.
+    """
+    if getattr(_batch, 'active', False):
+        yield
+        return
+    _batch.active = True
+    _batch.totals, _batch.approved, _batch.bump = Counter(), Counter(), False
+    try:
+        yield
+    finally:
+        _batch.active = False
+    # Only reached when the block succeeded
+    for event_id in _batch.totals.keys() | _batch.approved.keys():
+        Event.adjust_photo_counts(event_id, total=_batch.totals[event_id], approved=_batch.approved[event_id])
+    if _batch.bump:
+        bump_version('events')
+
+
+def _adjust_photo_counts(event_id, total=0, approved=0):
+    if getattr(_batch, 'active', False):
+        _batch.totals[event_id] += total
+        _batch.approved[event_id] += approved
+    else:
+        Event.adjust_photo_counts(event_id, total=total, approved=approved)
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+@receiver(post_save, sender=EventPhoto)
+@receiver(post_delete, sender=EventPhoto)
+def bump_events_version(sender, instance, **kwargs):
+    """
+    Signal handler to expire conditional GET validators of the events feed
+    whenever an event or one of its photos changes.
+    """
+    if getattr(_batch, 'active', False):
+        _batch.bump = True
+    else:
+        bump_version('events')
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def invalidate_timeline(sender, instance, **kwargs):
+    """
+    Signal handler to drop the cached timeline when an event is created,
+    edited, approved or deleted.
+    """
+    timeline.invalidate()
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def invalidate_slug(sender, instance, **kwargs):
+    """
+    Signal handler to drop the cached slug -> id entries of an event whose
+    slug may have changed or that was deleted.
+    """
+    slugs.invalidate(instance.slug, getattr(instance, '_stored_slug', None))
+    instance._stored_slug = instance.slug
+
+
+@receiver(post_save, sender=EventPhoto)
+def update_photo_counts_on_save(sender, instance, created, raw=False, **kwargs):
+    """
+    Signal handler to keep Event.photos_count and approved_photos_count in
+    step when a photo is added, approved, unapproved or moved to another event.
+    """
+    if raw:
+        return
+    
+    stored_event_id = getattr(instance, '_stored_event_id', None)
+    stored_is_approved = getattr(instance, '_stored_is_approved', None)
+    
+    if created:
+        _adjust_photo_counts(instance.event_id, total=1, approved=int(instance.is_approved))
+    elif stored_event_id is not None and stored_event_id != instance.event_id:
+        _adjust_photo_counts(stored_event_id, total=-1, approved=-int(bool(stored_is_approved)))
+        _adjust_photo_counts(instance.event_id, total=1, approved=int(instance.is_approved))
+    elif stored_is_approved is not None and stored_is_approved != instance.is_approved:
+        _adjust_photo_counts(instance.event_id, approved=1 if instance.is_approved else -1)
+    
+    instance._stored_event_id = instance.event_id
+    instance._stored_is_approved = instance.is_approved
+
+
+@receiver(post_delete, sender=EventPhoto)
+def update_photo_counts_on_delete(sender, instance, **kwargs):
+    """
+    Signal handler to decrement the photo counters of the photo's event.
+    Also runs for queryset deletes, which skip EventPhoto.delete().
+    """
+    is_approved = getattr(instance, '_stored_is_approved', instance.is_approved)
+    _adjust_photo_counts(instance.event_id, total=-1, approved=-int(bool(is_approved)))
+
+
+@receiver(post_delete, sender=Event)
+@receiver(post_delete, sender=EventPhoto)
+def delete_event_media(sender, instance, **kwargs):
+    """
+    Signal handler to remove the image files of a deleted event or photo
+    in the background once the delete commits. Covers queryset deletes and
+    the photos of a deleted event as well.
+    """
+    schedule_delete(*file_names(instance))
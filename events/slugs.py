@@ -0,0 +1,32 @@
+"""
+Cached slug -> primary key map for events.
+
+Shared event links carry the slug, so resolving one should not need an
+extra query. Entries live in the cache shared by all workers (see
+`CACHES`) and are dropped when the event is saved or deleted. Callers
+still compare the fetched event's slug, so a stale entry (e.g. after a
+set-based delete) only costs a fallback lookup.
+"""
+from django.core.cache import cache
+
+from .models import Event
+
+CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def _key(slug):
+    return f'events:slug:{slug}'
+
+
+def get_event_id(slug):
+    """Return the ID of the event with `slug`, or None."""
+    event_id = cache.get(_key(slug))
+    if event_id is None:
+        event_id = Event.objects.filter(slug=slug).values_list('id', flat=True).first()
+        if event_id is not None:
+            cache.set(_key(slug), event_id, CACHE_TIMEOUT)
+    return event_id
+
+
+def invalidate(*slugs):
+    cache.delete_many([_key(slug) for slug in slugs if slug])
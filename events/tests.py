@@ -1,3 +1,220 @@
-from django.test import TestCase
+import datetime
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import StopFutureHandlers
+from django.test import SimpleTestCase, TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from yearbook import storage
+from yearbook.uploadhandlers import HashingMemoryFileUploadHandler
+from yearbook.zipstream import ZIP64_LIMIT, ZipEntry
+
+from .models import Event, EventPhoto
+
+User = get_user_model()
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class EventDownloadTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        user = User.objects.create_user('owner', is_approved=True)
+        self.event = Event.objects.create(
+            title='Grad Day', date=datetime.date(2024, 6, 1), location='Hall',
+            description='Graduation', category='ACADEMIC', is_approved=True, created_by=user,
+        )
+        self.files = {}
+        for index, name in enumerate(['one.jpg', 'two.jpg', 'one.jpg']):
+            data = bytes([index]) * (1000 + index)
+            photo = EventPhoto(event=self.event, is_approved=True)
+            photo.image.save(name, ContentFile(data))
+            self.files[photo.image.name] = data
+        hidden = EventPhoto(event=self.event, is_approved=False)
+        hidden.image.save('hidden.jpg', ContentFile(b'hidden'))
+
+        self.client = APIClient()
+        self.url = f'/api/events/events/{self.event.id}/download/'
+
+    def download(self, **headers):
+        response = self.client.get(self.url, **headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_archive_contains_approved_photos(self):
+        response, body = self.download()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(int(response['Content-Length']), len(body))
+        archive = zipfile.ZipFile(io.BytesIO(body))
+        self.assertIsNone(archive.testzip())
+        # Clashing base names get a suffix instead of overwriting each other
+        self.assertEqual(len(set(archive.namelist())), 3)
+        self.assertEqual(sorted(archive.read(name) for name in archive.namelist()), sorted(self.files.values()))
+
+    def test_accepts_zip_media_type(self):
+        response, body = self.download(HTTP_ACCEPT='application/zip')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(zipfile.ZipFile(io.BytesIO(body)).testzip())
+
+    def test_errors_render_as_json_for_zip_clients(self):
+        self.url = '/api/events/events/999/download/'
+
+        response, body = self.download(HTTP_ACCEPT='application/zip')
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertIn(b'detail', body)
+
+    def test_resumed_download(self):
+        full_response, full = self.download()
+        start = len(full) // 2
+
+        response, part = self.download(HTTP_RANGE=f'bytes={start}-', HTTP_IF_RANGE=full_response['ETag'])
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes {start}-{len(full) - 1}/{len(full)}')
+        self.assertEqual(full[:start] + part, full)
+        self.assertIsNone(zipfile.ZipFile(io.BytesIO(full[:start] + part)).testzip())
+
+    def test_stale_if_range_sends_whole_archive(self):
+        _, full = self.download()
+
+        response, body = self.download(HTTP_RANGE='bytes=10-', HTTP_IF_RANGE='"stale"')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, full)
+
+    def test_unsatisfiable_range(self):
+        _, full = self.download()
+
+        response, _ = self.download(HTTP_RANGE=f'bytes={len(full)}-')
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(full)}')
+
+
+class ZipEntryTests(SimpleTestCase):
+    def entry_at(self, offset):
+        entry = ZipEntry('photo.jpg', 'events/photo.jpg', 10, datetime.datetime(2024, 6, 1))
+        entry.offset = offset
+        entry.crc = 0
+        return entry
+
+    def test_offset_at_limit_uses_zip64_field(self):
+        below, at = self.entry_at(ZIP64_LIMIT - 1), self.entry_at(ZIP64_LIMIT)
+
+        self.assertEqual(len(below.central_header()), below.central_length)
+        self.assertEqual(len(at.central_header()), at.central_length)
+        self.assertEqual(at.central_length, below.central_length + 12)
+
+
+class DeduplicatingStorageTests(SimpleTestCase):
+    def setUp(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        self.storage = storage.DeduplicatingFileSystemStorage(location=location)
+        self.data = b'same bytes' * 100
+        self.digest = hashlib.sha256(self.data).hexdigest()
+
+    def test_identical_files_share_one_blob(self):
+        first = self.storage.save('events/event_1/a.jpg', ContentFile(self.data))
+        second = self.storage.save('events/event_2/b.jpg', ContentFile(self.data))
+
+        blob = self.storage.blob_path(self.digest)
+        self.assertEqual(os.stat(blob).st_nlink, 3)
+        self.assertTrue(os.path.samefile(self.storage.path(first), self.storage.path(second)))
+        with self.storage.open(second) as f:
+            self.assertEqual(f.read(), self.data)
+
+    def test_blob_goes_with_its_last_name(self):
+        first = self.storage.save('a.jpg', ContentFile(self.data))
+        second = self.storage.save('b.jpg', ContentFile(self.data))
+        blob = self.storage.blob_path(self.digest)
+
+        self.storage.delete(first)
+        self.assertTrue(os.path.exists(blob))
+        self.assertTrue(self.storage.exists(second))
+
+        self.storage.delete(second)
+        self.assertFalse(os.path.exists(blob))
+
+    def test_delete_reads_the_digest_from_the_inode(self):
+        name = self.storage.save('a.jpg', ContentFile(self.data))
+        if storage.tagged_digest(self.storage.path(name)) is None:
+            self.skipTest('Extended attributes are not supported here')
+
+        with mock.patch.object(storage, 'file_hash', side_effect=AssertionError('file re-read')):
+            self.storage.delete(name)
+
+        self.assertFalse(os.path.exists(self.storage.blob_path(self.digest)))
+
+    def test_upload_handler_attaches_the_digest(self):
+        handler = HashingMemoryFileUploadHandler()
+        handler.handle_raw_input(None, {}, len(self.data), boundary=b'')
+        with self.assertRaises(StopFutureHandlers):
+            # How the memory handler claims the file
+            handler.new_file('image', 'a.jpg', 'image/jpeg', len(self.data))
+        for start in range(0, len(self.data), 64):
+            handler.receive_data_chunk(self.data[start:start + 64], start)
+        uploaded = handler.file_complete(len(self.data))
+
+        self.assertEqual(getattr(uploaded, storage.HASH_ATTR), self.digest)
+        with mock.patch.object(storage.hashlib, 'sha256', side_effect=AssertionError('file re-hashed')):
+            self.assertEqual(storage.content_hash(uploaded), self.digest)
+
+
+@override_settings(CACHES=LOCMEM_CACHE, WARN_DUPLICATE_UPLOADS=True)
+class DuplicateUploadTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        user = User.objects.create_user('owner', is_approved=True, is_staff=True)
+        self.event = Event.objects.create(
+            title='Grad Day', date=datetime.date(2024, 6, 1), location='Hall',
+            description='Graduation', category='ACADEMIC', is_approved=True, created_by=user,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        buffer = io.BytesIO()
+        Image.new('RGB', (20, 20), 'red').save(buffer, 'JPEG')
+        self.image = buffer.getvalue()
+
+    def upload(self, name):
+        return self.client.post(
+            f'/api/events/events/{self.event.id}/photos/',
+            {'image': SimpleUploadedFile(name, self.image, 'image/jpeg')},
+            format='multipart',
+        )
+
+    def test_second_upload_is_flagged_and_shares_storage(self):
+        first = self.upload('first.jpg')
+        second = self.upload('second.jpg')
+
+        self.assertEqual(second.status_code, 201)
+        self.assertNotIn('warnings', first.data)
+        self.assertEqual(second.data['warnings'][0]['duplicate_of'], first.data['id'])
+        photos = EventPhoto.objects.order_by('id')
+        self.assertEqual({photo.content_hash for photo in photos}, {hashlib.sha256(self.image).hexdigest()})
+        self.assertTrue(os.path.samefile(photos[0].image.path, photos[1].image.path))
@@ -0,0 +1,101 @@
+"""
+Cached yearbook timeline of approved events.
+
+The whole timeline (per-year and per-month buckets with a count per
+category and the top events of each bucket) is built with two aggregate
+queries and kept in the cache until an event is created, edited, approved
+or deleted. Reads are a single cache get.
+"""
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db.models import Count, F, Window
+from django.db.models.functions import ExtractMonth, ExtractYear, RowNumber
+
+from .models import Event
+
+CACHE_KEY = 'events:timeline'
+CACHE_TIMEOUT = None  # Invalidated by the Event signals
+TOP_EVENTS = 3
+
+# Bigger events first, then the earliest one
+RANKING = [F('attendees_count').desc(), F('date').asc(), F('id').asc()]
+
+
+def _empty_bucket(**fields):
+    return {
+        **fields,
+        'count': 0,
+        'categories': {code: 0 for code, _ in Event.CATEGORY_CHOICES},
+        'top_events': [],
+    }
+
+
+def _top_event(row):
+    return {
+        'id': row['id'],
+        'slug': row['slug'],
+        'title': row['title'],
+        'date': row['date'].isoformat(),
+        'category': row['category'],
+        'attendees_count': row['attendees_count'],
+        'approved_photos_count': row['approved_photos_count'],
+        'cover_image_url': default_storage.url(row['cover_image']) if row['cover_image'] else None,
+    }
+
+
+def _rank_key(event):
+    return (-event['attendees_count'], event['date'], event['id'])
+
+
+def compute():
+    approved = Event.objects.filter(is_approved=True).annotate(
+        year=ExtractYear('date'),
+        month=ExtractMonth('date'),
+    )
+
+    months = {}
+    counts = approved.order_by().values('year', 'month', 'category').annotate(total=Count('id'))
+    for row in counts:
+        key = (row['year'], row['month'])
+        bucket = months.setdefault(key, _empty_bucket(year=row['year'], month=row['month']))
+        bucket['count'] += row['total']
+        bucket['categories'][row['category']] += row['total']
+
+    top = approved.annotate(
+        rank=Window(RowNumber(), partition_by=[F('year'), F('month')], order_by=RANKING),
+    ).filter(rank__lte=TOP_EVENTS).order_by('year', 'month', 'rank').values(
+        'id', 'slug', 'title', 'date', 'category', 'attendees_count',
+        'approved_photos_count', 'cover_image', 'year', 'month',
+    )
+    for row in top:
+        months[(row['year'], row['month'])]['top_events'].append(_top_event(row))
+
+    years = {}
+    for (year, month), bucket in sorted(months.items(), reverse=True):
+        entry = years.setdefault(year, {**_empty_bucket(year=year), 'months': []})
+        entry['count'] += bucket['count']
+        for code, total in bucket['categories'].items():
+            entry['categories'][code] += total
+        # A year's top events are always among its months' top events
+        entry['top_events'] = sorted(entry['top_events'] + bucket['top_events'], key=_rank_key)[:TOP_EVENTS]
+        bucket = dict(bucket)
+        del bucket['year']
+        entry['months'].append(bucket)
+
+    return {
+        'total': sum(entry['count'] for entry in years.values()),
+        'categories': dict(Event.CATEGORY_CHOICES),
+        'years': list(years.values()),
+    }
+
+
+def get_timeline():
+    timeline = cache.get(CACHE_KEY)
+    if timeline is None:
+        timeline = compute()
+        cache.set(CACHE_KEY, timeline, CACHE_TIMEOUT)
+    return timeline
+
+
+def invalidate():
+    cache.delete(CACHE_KEY)
@@ -0,0 +1,151 @@
+"""
+Bulk photo uploads for an event.
+
+Each file is checked with Pillow, written to its final storage path and
+thumbnailed on a bounded, process-wide thread pool, then every `EventPhoto`
+row is created with a single `bulk_create`. Uploads Django already spooled
+to a temporary file are moved into place by `FileSystemStorage` rather than
+copied.
+"""
+import atexit
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image
+
+from yearbook import renditions
+from yearbook.conditional import bump_version
+from yearbook.storage import content_hash
+
+from .models import Event, EventPhoto, event_image_path
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'MAX_FILES': 500,
+    'WORKERS': 4,
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'BULK_PHOTO_UPLOAD', {})}
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=get_config()['WORKERS'],
+                    thread_name_prefix='photo-upload',
+                )
+                atexit.register(_executor.shutdown)
+    return _executor
+
+
+def verify_image(upload):
+    """Raise ValueError unless `upload` decodes as an image."""
+    try:
+        with Image.open(upload) as image:
+            image.verify()
+    except Exception as exc:
+        raise ValueError('Upload a valid image. The file you uploaded was either not an image or a corrupted image.') from exc
+    finally:
+        upload.seek(0)
+
+
+def store_upload(photo, upload):
+    """Validate one file, save it where `photo.image` will point and render its thumbnail."""
+    verify_image(upload)
+    photo.content_hash = content_hash(upload)
+    name = default_storage.save(event_image_path(photo, upload.name), upload)
+    try:
+        renditions.generate(name, 'thumb')
+    except renditions.RenditionError:
+        # The thumbnail is generated on first request instead
+        logger.warning('Could not prerender a thumbnail for %s', name, exc_info=True)
+    return name
+
+
+def bulk_create_photos(event, uploads, user, caption=''):
+    """
+    Store `uploads` for `event` in parallel and create their rows in one
+    INSERT. Returns (photos, errors), where each error names the rejected
+    file and why.
+    """
+    is_approved = getattr(user, 'is_staff', False)  # Auto-approve for staff
+    pending = [
+        EventPhoto(event=event, caption=caption, uploaded_by=user, is_approved=is_approved)
+        for _ in uploads
+    ]
+
+    executor = get_executor()
+    futures = [executor.submit(store_upload, photo, upload) for photo, upload in zip(pending, uploads)]
+
+    photos, errors = [], []
+    for index, (photo, upload, future) in enumerate(zip(pending, uploads, futures)):
+        try:
+            # Assigning the stored name marks the file committed, so the
+            # INSERT doesn't write it a second time
+            photo.image = future.result()
+        except Exception as exc:
+            if not isinstance(exc, ValueError):
+                logger.exception('Storing %s for event %s failed', upload.name, event.id)
+            errors.append({'index': index, 'file': upload.name, 'error': str(exc)})
+            continue
+        photos.append(photo)
+
+    if not photos:
+        return photos, errors
+
+    try:
+        with transaction.atomic():
+            photos = EventPhoto.objects.bulk_create(photos)
+            # bulk_create skips the post_save signals that maintain the counters
+            Event.adjust_photo_counts(
+                event.id,
+                total=len(photos),
+                approved=len(photos) if is_approved else 0,
+            )
+    except Exception:
+        for photo in photos:
+            default_storage.delete(photo.image.name)
+            renditions.delete_all(photo.image.name)
+        raise
+
+    transaction.on_commit(lambda: bump_version('events'))
+    return photos, errors
+
+
+def duplicate_warnings(event, photos):
+    """
+    Warnings for `photos` whose bytes were already in `event`, either
+    uploaded earlier or earlier in the same batch.
+    """
+    new_ids = {photo.pk for photo in photos}
+    earlier = dict(
+        EventPhoto.objects.filter(event=event, content_hash__in={photo.content_hash for photo in photos if photo.content_hash})
+        .exclude(pk__in=new_ids)
+        .values_list('content_hash', 'pk')
+    )
+    warnings = []
+    for photo in photos:
+        if not photo.content_hash:
+            continue
+        if photo.content_hash in earlier:
+            warnings.append({
+                'id': photo.pk,
+                'duplicate_of': earlier[photo.content_hash],
+                'warning': 'This photo is already in the event.',
+            })
+        else:
+            earlier[photo.content_hash] = photo.pk
+    return warnings
@@ -1,7 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from . import views
-from .views_admin import PendingEventsView, PendingPhotosView
+from .views_admin import PendingEventsView, PendingPhotosView, BulkEventModerationView, BulkPhotoModerationView
 
 router = DefaultRouter()
 router.register(r'events', views.EventViewSet, basename='event')
@@ -21,7 +21,9 @@ urlpatterns = [
     path('admin/', include([
         path('pending-events/', PendingEventsView.as_view(), name='pending-events'),
         path('pending-events/<int:event_id>/', PendingEventsView.as_view(), name='manage-event'),
+        path('pending-events/bulk/', BulkEventModerationView.as_view(), name='bulk-moderate-events'),
         path('pending-photos/', PendingPhotosView.as_view(), name='pending-photos'),
         path('pending-photos/<int:photo_id>/', PendingPhotosView.as_view(), name='manage-photo'),
+        path('pending-photos/bulk/', BulkPhotoModerationView.as_view(), name='bulk-moderate-photos'),
     ])),
 ]
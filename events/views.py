@@ -1,16 +1,60 @@
 from rest_framework import viewsets, status, filters, permissions, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.parsers import FormParser
+from rest_framework.settings import api_settings
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
-from django.shortcuts import get_object_or_404
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import Prefetch, Q
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema
 import os
 
 from .models import Event, EventPhoto
-from .serializers import EventSerializer, EventCreateSerializer, EventPhotoSerializer
+from .serializers import (
+    EventSerializer, EventListSerializer, EventCreateSerializer, EventPhotoSerializer,
+    EventPhotoBulkUploadSerializer,
+)
+from .slugs import get_event_id, invalidate as invalidate_slugs
+from .timeline import get_timeline
+from .uploads import bulk_create_photos, duplicate_warnings
 from users.permissions import IsAdminOrReadOnly, IsOwnerOrReadOnly, IsApprovedUser
+from yearbook.pagination import KeysetPagination, KeysetPaginationMixin
+from yearbook.conditional import conditional_list
+from yearbook.parsers import UploadLimitMultiPartParser
+from yearbook.renderers import PassthroughRenderer
+from yearbook.zipstream import ZipStream, parse_range
+
+
+class EventPhotoKeysetPagination(KeysetPagination):
+    ordering_field = 'uploaded_at'
+
+
+def album_files(event):
+    """Yield ZIP entries (arcname, storage name, size, modified) for an event's approved photos."""
+    photos = (
+        EventPhoto.objects.filter(event=event, is_approved=True)
+        .exclude(image='')
+        .order_by('uploaded_at', 'id')
+        .values_list('image', 'uploaded_at')
+    )
+    used = set()
+    for name, uploaded_at in photos:
+        try:
+            size = default_storage.size(name)
+        except OSError:
+            continue  # Missing from storage
+        arcname = os.path.basename(name)
+        root, ext = os.path.splitext(arcname)
+        suffix = 1
+        while arcname in used:
+            suffix += 1
+            arcname = f'{root}_{suffix}{ext}'
+        used.add(arcname)
+        yield arcname, name, size, uploaded_at
+
 
 @extend_schema(tags=['Events'])
 class EventViewSet(viewsets.ModelViewSet):
@@ -24,11 +68,13 @@ class EventViewSet(viewsets.ModelViewSet):
     search_fields = ['title', 'description', 'location']
     ordering_fields = ['date', 'created_at', 'attendees_count']
     ordering = ['-date']
-    parser_classes = [MultiPartParser, FormParser]
+    parser_classes = [UploadLimitMultiPartParser, FormParser]
     
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
             return EventCreateSerializer
+        if self.action == 'list':
+            return EventListSerializer
         return EventSerializer
     
     def get_permissions(self):
@@ -53,7 +99,21 @@ class EventViewSet(viewsets.ModelViewSet):
         - Admin users can see all events
         """
         user = self.request.user
-        queryset = Event.objects.all()
+        queryset = Event.objects.select_related('created_by__profile')
+        
+        if self.action == 'list':
+            # Only the first few approved photos, fetched in one windowed query
+            queryset = queryset.prefetch_related(Prefetch(
+                'photos',
+                queryset=EventPhoto.objects.filter(is_approved=True)
+                .order_by('-uploaded_at')[:EventListSerializer.PREVIEW_PHOTOS],
+                to_attr='preview_photos',
+            ))
+        elif self.action != 'download':
+            queryset = queryset.prefetch_related(Prefetch(
+                'photos',
+                queryset=EventPhoto.objects.select_related('uploaded_by__profile'),
+            ))
         
         # For unauthenticated users, only show approved events
         if not user.is_authenticated:
@@ -66,10 +126,115 @@ class EventViewSet(viewsets.ModelViewSet):
         # For regular authenticated users, show approved events + their own unapproved events
         return queryset.filter(Q(is_approved=True) | Q(created_by=user))
     
+    @conditional_list('events', 'users')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    @extend_schema(
+        tags=['Events'],
+        description='Get an event by its slug',
+        responses={200: EventSerializer}
+    )
+    @action(detail=False, methods=['get'], url_path=r'by-slug/(?P<slug>[-\w]+)')
+    def by_slug(self, request, slug=None):
+        """Get an event by slug; same representation and visibility rules as retrieve"""
+        event = self._get_object_by_slug(slug, refresh=False)
+        if event is None or event.slug != slug:
+            # Missing or stale cache entry: look the slug up again
+            event = self._get_object_by_slug(slug, refresh=True)
+            if event is None:
+                raise Http404
+        serializer = self.get_serializer(event)
+        return Response(serializer.data)
+    
+    def _get_object_by_slug(self, slug, refresh):
+        if refresh:
+            invalidate_slugs(slug)
+        event_id = get_event_id(slug)
+        if event_id is None:
+            return None
+        self.kwargs[self.lookup_url_kwarg or self.lookup_field] = event_id
+        try:
+            return self.get_object()
+        except Http404:
+            return None
+    
+    @extend_schema(
+        tags=['Events'],
+        description='Approved events grouped by year and month, with counts per category and the top events of each bucket',
+        responses={200: OpenApiTypes.OBJECT}
+    )
+    @action(detail=False, methods=['get'])
+    @conditional_list('events')
+    def timeline(self, request):
+        """Get the yearbook timeline from the cached aggregates"""
+        data = get_timeline()
+        
+        def absolute(events):
+            return [
+                {**event, 'cover_image_url': request.build_absolute_uri(event['cover_image_url'])}
+                if event['cover_image_url'] else event
+                for event in events
+            ]
+        
+        years = [
+            {
+                **year,
+                'top_events': absolute(year['top_events']),
+                'months': [{**month, 'top_events': absolute(month['top_events'])} for month in year['months']],
+            }
+            for year in data['years']
+        ]
+        return Response({**data, 'years': years})
+    
     def perform_create(self, serializer):
         # Set the created_by user to the current user
         serializer.save(created_by=self.request.user)
     
+    @extend_schema(
+        tags=['Events'],
+        description='Download the approved photos of an event as a ZIP archive (supports Range)',
+        responses={(200, 'application/zip'): OpenApiTypes.BINARY}
+    )
+    # The passthrough renderer comes last, so JSON still answers errors for
+    # clients that accept it
+    @action(detail=True, methods=['get'], renderer_classes=[*api_settings.DEFAULT_RENDERER_CLASSES, PassthroughRenderer])
+    def download(self, request, pk=None):
+        """Stream the event's approved photos as an uncompressed ZIP"""
+        event = self.get_object()
+        archive = ZipStream(album_files(event))
+        
+        headers = {
+            'Content-Disposition': f'attachment; filename="{event.slug}.zip"',
+            'Accept-Ranges': 'bytes',
+            'ETag': archive.etag,
+        }
+        byte_range = None
+        if_range = request.headers.get('If-Range')
+        if not if_range or if_range == archive.etag:
+            try:
+                byte_range = parse_range(request.headers.get('Range'), archive.size)
+            except ValueError:
+                return HttpResponse(
+                    status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                    headers={**headers, 'Content-Range': f'bytes */{archive.size}'},
+                )
+        
+        if byte_range is None:
+            response = StreamingHttpResponse(archive.stream(), content_type='application/zip', headers=headers)
+            response['Content-Length'] = archive.size
+            return response
+        
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            archive.stream(start, end),
+            status=status.HTTP_206_PARTIAL_CONTENT,
+            content_type='application/zip',
+            headers={**headers, 'Content-Range': f'bytes {start}-{end}/{archive.size}'},
+        )
+        response['Content-Length'] = end - start + 1
+        return response
+    
     @extend_schema(
         tags=['Events'],
         description='Approve an event (admin only)',
@@ -98,42 +263,77 @@ class EventViewSet(viewsets.ModelViewSet):
 
 
 @extend_schema(tags=['Event Photos'])
-class EventPhotoViewSet(viewsets.ModelViewSet):
+class EventPhotoViewSet(KeysetPaginationMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows event photos to be managed.
     """
     serializer_class = EventPhotoSerializer
-    parser_classes = [MultiPartParser, FormParser]
+    keyset_pagination_class = EventPhotoKeysetPagination
+    parser_classes = [UploadLimitMultiPartParser, FormParser]
+    
+    def get_event(self):
+        """
+        Return the parent event from the URL, or None if it doesn't exist or
+        isn't visible to the user. Only the upload actions need the event
+        itself; reads apply the same rules inside the photo query.
+        """
+        if not hasattr(self, '_event'):
+            self._event = self._fetch_event()
+        return self._event
+    
+    def _event_id(self):
+        try:
+            return int(self.kwargs.get('event_pk'))
+        except (TypeError, ValueError):
+            return None
+    
+    def _fetch_event(self):
+        event_id = self._event_id()
+        if event_id is None:
+            return None
+        
+        event = Event.objects.filter(id=event_id).only('id', 'slug', 'is_approved', 'created_by_id').first()
+        if event is None:
+            return None
+        
+        user = self.request.user
+        # Same rule as EventViewSet: unapproved events are only visible to their creator and admins
+        if not event.is_approved and not (user.is_authenticated and (
+            getattr(user, 'is_staff', False) or event.created_by_id == user.id
+        )):
+            return None
+        return event
     
     def get_queryset(self):
         """
         Return photos for a specific event.
         Only show approved photos to non-owners and non-admins.
+        
+        The event's visibility is checked through the join in the same query,
+        so a missing or hidden event simply yields no photos.
         """
-        # Get the event_id from the URL parameters
-        event_id = self.kwargs.get('event_pk')
-        if not event_id:
-            return EventPhoto.objects.none()
-            
-        try:
-            event = Event.objects.get(id=event_id)
-            queryset = EventPhoto.objects.filter(event=event)
-            user = self.request.user
-            
-            # For unauthenticated users or non-owners, only show approved photos
-            if not user.is_authenticated or (user != event.created_by and not getattr(user, 'is_staff', False)):
-                queryset = queryset.filter(is_approved=True)
-                
-            return queryset.order_by('-uploaded_at')
-            
-        except Event.DoesNotExist:
+        event_id = self._event_id()
+        if event_id is None:
             return EventPhoto.objects.none()
+        
+        queryset = EventPhoto.objects.filter(event_id=event_id).select_related('uploaded_by__profile')
+        
+        user = self.request.user
+        if not getattr(user, 'is_staff', False):
+            # Owners see every photo of their event, approved or not; everyone
+            # else sees approved photos of approved events
+            visible = Q(event__is_approved=True, is_approved=True)
+            if user.is_authenticated:
+                visible |= Q(event__created_by_id=user.id)
+            queryset = queryset.filter(visible)
+        
+        return queryset.order_by('-uploaded_at')
     
     def get_permissions(self):
         """
         Instantiates and returns the list of permissions that this view requires.
         """
-        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+        if self.action in ['create', 'bulk_upload', 'update', 'partial_update', 'destroy']:
             permission_classes = [permissions.IsAuthenticated, IsApprovedUser]
         elif self.action in ['approve', 'unapprove']:
             permission_classes = [permissions.IsAdminUser]
@@ -143,37 +343,63 @@ class EventPhotoViewSet(viewsets.ModelViewSet):
     
     def perform_create(self, serializer):
         """Set the event and uploaded_by user when creating a photo."""
-        event_id = self.kwargs.get('event_pk')
-        if not event_id:
+        if not self.kwargs.get('event_pk'):
             raise serializers.ValidationError("Event ID is required")
-            
+        
+        event = self.get_event()
+        if event is None:
+            raise serializers.ValidationError("Event not found")
+        
         try:
-            event = Event.objects.get(id=event_id)
-            # Set the event on the instance before saving
+            # The event is set before the INSERT, so event_image_path writes
+            # the upload straight to events/event_<id>/event_<id>_<filename>
             instance = serializer.save(
                 event=event,
                 uploaded_by=self.request.user,
                 is_approved=getattr(self.request.user, 'is_staff', False)  # Auto-approve for staff
             )
-            
-            # Update the filename to include the event ID
-            if hasattr(instance, 'image') and instance.image:
-                old_path = instance.image.path
-                new_filename = f"event_{event_id}_{os.path.basename(instance.image.name)}"
-                new_path = os.path.join(os.path.dirname(old_path), new_filename)
-                
-                # Rename the file
-                if os.path.exists(old_path):
-                    os.rename(old_path, new_path)
-                
-                # Update the instance with the new path
-                instance.image.name = os.path.join(os.path.dirname(instance.image.name), new_filename)
-                instance.save(update_fields=['image'])
-                
-        except Event.DoesNotExist:
-            raise serializers.ValidationError("Event not found")
         except Exception as e:
             raise serializers.ValidationError(f"Error processing image: {str(e)}")
+        
+        if settings.WARN_DUPLICATE_UPLOADS:
+            self.upload_warnings = duplicate_warnings(event, [instance])
+    
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        warnings = getattr(self, 'upload_warnings', None)
+        if warnings:
+            response.data['warnings'] = warnings
+        return response
+    
+    @extend_schema(
+        tags=['Event Photos'],
+        description='Upload many photos to an event in one request',
+        request=EventPhotoBulkUploadSerializer,
+        responses={201: EventPhotoSerializer(many=True)}
+    )
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_upload(self, request, event_pk=None):
+        """Upload several photos at once; files that fail validation are reported and skipped"""
+        event = self.get_event()
+        if event is None:
+            raise Http404
+        upload = EventPhotoBulkUploadSerializer(data=request.data)
+        upload.is_valid(raise_exception=True)
+        
+        photos, errors = bulk_create_photos(
+            event,
+            upload.validated_data['images'],
+            request.user,
+            caption=upload.validated_data['caption'],
+        )
+        
+        data = {
+            'created': EventPhotoSerializer(photos, many=True, context=self.get_serializer_context()).data,
+            'errors': errors,
+        }
+        if settings.WARN_DUPLICATE_UPLOADS and photos:
+            data['warnings'] = duplicate_warnings(event, photos)
+        return Response(data, status=status.HTTP_201_CREATED if photos else status.HTTP_400_BAD_REQUEST)
     
     @extend_schema(
         tags=['Event Photos'],
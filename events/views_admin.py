@@ -3,8 +3,15 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAdminUser
 from drf_spectacular.utils import extend_schema
+from collections import Counter
+from django.db import transaction
+from django.utils import timezone
+from yearbook.conditional import bump_version
+from yearbook.serializers import BulkModerationSerializer
+from . import timeline
 from .models import Event, EventPhoto
-from .serializers import EventSerializer, EventPhotoSerializer
+from .signals import batched_upkeep
+from .serializers import EventSerializer, EventPhotoSerializer, BulkPhotoModerationSerializer
 
 @extend_schema(tags=['Admin - Events'])
 class PendingEventsView(APIView):
@@ -37,7 +44,7 @@ class PendingEventsView(APIView):
             
             if action == 'approve':
                 event.is_approved = True
-                event.save()
+                event.save(update_fields=['is_approved', 'updated_at'])
                 return Response(
                     {'status': 'approved', 'message': 'Event approved successfully'},
                     status=status.HTTP_200_OK
@@ -91,7 +98,7 @@ class PendingPhotosView(APIView):
             
             if action == 'approve':
                 photo.is_approved = True
-                photo.save()
+                photo.save(update_fields=['is_approved'])
                 return Response(
                     {'status': 'approved', 'message': 'Photo approved successfully'},
                     status=status.HTTP_200_OK
@@ -113,3 +120,123 @@ class PendingPhotosView(APIView):
                 {'error': 'Photo not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
+
+
+@extend_schema(tags=['Admin - Events'])
+class BulkEventModerationView(APIView):
+    """
+    API endpoint to approve or reject many events in one request
+    """
+    permission_classes = [IsAdminUser]
+    
+    @extend_schema(
+        description='Approve or reject a list of events',
+        request=BulkModerationSerializer,
+        responses={200: None, 400: None}
+    )
+    def post(self, request):
+        """
+        Approve or reject a list of events.
+        Expects {"ids": [...], "action": "approve" | "reject"} and reports
+        the outcome for every requested ID. Rejecting an event deletes its
+        photos as well.
+        """
+        serializer = BulkModerationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        action = serializer.validated_data['action']
+        
+        with transaction.atomic():
+            found = dict(
+                Event.objects.filter(id__in=ids).values_list('id', 'is_approved')
+            )
+            
+            if action == 'approve':
+                pending = [event_id for event_id, is_approved in found.items() if not is_approved]
+                Event.objects.filter(id__in=pending).update(is_approved=True, updated_at=timezone.now())
+                # update() skips the Event signals that keep these fresh
+                if pending:
+                    transaction.on_commit(timeline.invalidate)
+                    transaction.on_commit(lambda: bump_version('events'))
+                outcomes = {event_id: 'approved' for event_id in pending}
+                outcomes.update({
+                    event_id: 'already_approved'
+                    for event_id, is_approved in found.items() if is_approved
+                })
+            else:
+                # The delete signals handle media, slugs, counters and caches
+                with batched_upkeep():
+                    Event.objects.filter(id__in=list(found)).delete()
+                outcomes = {event_id: 'rejected' for event_id in found}
+        
+        results = [{'id': event_id, 'status': outcomes.get(event_id, 'not_found')} for event_id in ids]
+        return Response(
+            {
+                'action': action,
+                'processed': len(outcomes),
+                'results': results,
+            },
+            status=status.HTTP_200_OK
+        )
+
+
+@extend_schema(tags=['Admin - Event Photos'])
+class BulkPhotoModerationView(APIView):
+    """
+    API endpoint to approve or reject many event photos in one request
+    """
+    permission_classes = [IsAdminUser]
+    
+    @extend_schema(
+        description='Approve or reject a list of photos, or every pending photo of an event',
+        request=BulkPhotoModerationSerializer,
+        responses={200: None, 400: None}
+    )
+    def post(self, request):
+        """
+        Approve or reject photos.
+        Expects {"ids": [...], "action": ...} or {"event": <id>, "action": ...};
+        the latter moderates every pending photo of that event.
+        """
+        serializer = BulkPhotoModerationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data.get('ids')
+        event_id = serializer.validated_data.get('event')
+        action = serializer.validated_data['action']
+        
+        if ids:
+            photos = EventPhoto.objects.filter(id__in=ids)
+        else:
+            photos = EventPhoto.objects.filter(event_id=event_id, is_approved=False)
+        
+        with transaction.atomic():
+            rows = list(photos.values_list('id', 'event_id', 'is_approved'))
+            
+            if action == 'approve':
+                pending = [row for row in rows if not row[2]]
+                EventPhoto.objects.filter(id__in=[row[0] for row in pending]).update(is_approved=True)
+                # update() skips the post_save signal that maintains the counters
+                for photo_event_id, count in Counter(row[1] for row in pending).items():
+                    Event.adjust_photo_counts(photo_event_id, approved=count)
+                if pending:
+                    transaction.on_commit(lambda: bump_version('events'))
+                outcomes = {row[0]: 'approved' for row in pending}
+                outcomes.update({row[0]: 'already_approved' for row in rows if row[2]})
+            else:
+                # The delete signals handle media, counters and caches
+                with batched_upkeep():
+                    EventPhoto.objects.filter(id__in=[row[0] for row in rows]).delete()
+                outcomes = {row[0]: 'rejected' for row in rows}
+        
+        results = [
+            {'id': photo_id, 'status': outcomes.get(photo_id, 'not_found')}
+            for photo_id in (ids or [row[0] for row in rows])
+        ]
+        return Response(
+            {
+                'action': action,
+                'processed': len(outcomes),
+                'results': results,
+            },
+            status=status.HTTP_200_OK
+        )
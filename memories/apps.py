@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class MemoriesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'memories'
+
+    def ready(self):
+        # Import and register the signals
+        import memories.signals  # noqa
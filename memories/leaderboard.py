@@ -0,0 +1,86 @@
+"""
+Cached "top liked" leaderboard for memories.
+
+Two variants are kept in the cache: `approved` (what anonymous users see)
+and `all` (what staff see). Regular users get the approved variant merged
+with their own unapproved memories. Each variant is a short list of
+(id, likes_count, created_at timestamp) entries. A like toggle that can
+change a board drops it, and the next read recomputes it from the
+`memory_likes_idx` index; toggles on memories far below the board leave
+it cached.
+"""
+from django.core.cache import cache
+
+from .models import Memory
+
+LEADERBOARD_SIZE = 10
+CACHE_TIMEOUT = 5 * 60
+CACHE_KEYS = {
+    'approved': 'memories:top_liked:approved',
+    'all': 'memories:top_liked:all',
+}
+
+
+def _sort_key(entry):
+    memory_id, likes_count, created_at = entry
+    return (likes_count, created_at, memory_id)
+
+
+def _rows(queryset):
+    rows = queryset.order_by('-likes_count', '-created_at', '-id').values_list(
+        'id', 'likes_count', 'created_at'
+    )[:LEADERBOARD_SIZE]
+    return [(memory_id, likes_count, created_at.timestamp()) for memory_id, likes_count, created_at in rows]
+
+
+def _compute(variant):
+    queryset = Memory.objects.all()
+    if variant == 'approved':
+        queryset = queryset.filter(is_approved=True)
+    return _rows(queryset)
+
+
+def _entries(variant):
+    entries = cache.get(CACHE_KEYS[variant])
+    if entries is None:
+        entries = _compute(variant)
+        cache.set(CACHE_KEYS[variant], entries, CACHE_TIMEOUT)
+    return entries
+
+
+def top_liked_ids(user):
+    """Return the IDs of the top liked memories visible to `user`, best first."""
+    if user.is_authenticated and user.is_staff:
+        entries = _entries('all')
+    else:
+        entries = _entries('approved')
+        if user.is_authenticated:
+            own = _rows(Memory.objects.filter(created_by=user, is_approved=False))
+            entries = sorted(entries + own, key=_sort_key, reverse=True)[:LEADERBOARD_SIZE]
+    return [memory_id for memory_id, _, _ in entries]
+
+
+def record_like_change(memory):
+    """
+    Drop the cached variants whose ranking a new `memory.likes_count` can
+    change. Boards are never written back here: two toggles adjusting the
+    same cached list concurrently would lose one update, so the next read
+    recomputes instead (an index walk of LEADERBOARD_SIZE rows).
+    """
+    variants = ['all', 'approved'] if memory.is_approved else ['all']
+    stale = []
+    for variant in variants:
+        entries = cache.get(CACHE_KEYS[variant])
+        if entries is None:
+            continue
+        listed = any(memory_id == memory.id for memory_id, _, _ in entries)
+        entry = (memory.id, memory.likes_count, memory.created_at.timestamp())
+        # An unlisted memory still below the last slot of a full board can't enter it
+        if listed or len(entries) < LEADERBOARD_SIZE or _sort_key(entry) > _sort_key(entries[-1]):
+            stale.append(CACHE_KEYS[variant])
+    if stale:
+        cache.delete_many(stale)
+
+
+def invalidate():
+    cache.delete_many(list(CACHE_KEYS.values()))
@@ -0,0 +1,208 @@
+"""
+Optional write-behind buffering of memory like toggles.
+
+When `LIKE_WRITE_BEHIND['ENABLED']` is set, `MemoryViewSet.like` records the
+desired state of each (memory, user) pair here instead of writing to the
+database, and answers with the optimistic result. Repeated toggles of the
+same pair coalesce. A daemon thread flushes the pending pairs every
+`FLUSH_INTERVAL` seconds (sooner once `MAX_BATCH` pairs are waiting) in a
+single transaction, then recounts `likes_count` for the touched memories,
+so a burst of likes costs one write transaction instead of one per click.
+
+The buffer lives in each worker process: a toggle is visible to other
+workers, and to `has_liked`, only after it has been flushed.
+"""
+import atexit
+import logging
+import threading
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from yearbook.conditional import mark_changed
+
+from . import leaderboard
+from .models import Memory
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': False,
+    'FLUSH_INTERVAL': 1.0,
+    'MAX_BATCH': 500,
+}
+
+# Pairs per DELETE statement, to stay clear of SQLite's variable limit
+DELETE_CHUNK = 200
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'LIKE_WRITE_BEHIND', {})}
+
+
+def is_enabled():
+    return get_config()['ENABLED']
+
+
+class LikeBuffer:
+    """
+    Pending like states keyed by (memory_id, user_id). Each entry is
+    (base, desired): the state the database holds (or will hold once the
+    in-flight batch commits) and the state the user asked for.
+    """
+
+    def __init__(self, flush_interval, max_batch):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pending = {}
+        self._deltas = {}
+        self._inflight = {}
+        self._inflight_deltas = {}
+        self._flushes = 0  # Bumped whenever an in-flight batch is dropped
+        self._thread = None
+
+    def toggle(self, memory, user_id):
+        """Record a toggle and return the optimistic (liked, likes_count)."""
+        key = (memory.id, user_id)
+        Like = Memory.likes.through
+        db_state = read_at = None
+        while True:
+            with self._lock:
+                if key in self._pending:
+                    base, current = self._pending[key]
+                elif key in self._inflight:
+                    base = current = self._inflight[key][1]
+                elif db_state is not None and read_at == self._flushes:
+                    base = current = db_state
+                else:
+                    # Unknown pair, or the stored state was read while a batch
+                    # was being written: (re)read it outside the lock
+                    read_at = self._flushes
+                    base = None
+
+                if base is not None:
+                    desired = not current
+                    old = int(current) - int(base)
+                    new = int(desired) - int(base)
+                    if desired == base:
+                        self._pending.pop(key, None)
+                    else:
+                        self._pending[key] = (base, desired)
+                    self._deltas[memory.id] = self._deltas.get(memory.id, 0) + new - old
+
+                    likes_count = (
+                        memory.likes_count
+                        + self._inflight_deltas.get(memory.id, 0)
+                        + self._deltas[memory.id]
+                    )
+                    if not self._deltas[memory.id]:
+                        del self._deltas[memory.id]
+                    backlog = len(self._pending)
+                    break
+
+            db_state = Like.objects.filter(memory_id=memory.id, user_id=user_id).exists()
+
+        self._ensure_started()
+        if backlog >= self.max_batch:
+            self._wake.set()
+        return desired, max(likes_count, 0)
+
+    def flush(self):
+        """Apply every pending toggle in one transaction. Returns the number of pairs written."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch, self._pending = self._pending, {}
+                deltas, self._deltas = self._deltas, {}
+                self._inflight, self._inflight_deltas = batch, deltas
+
+            try:
+                touched = self._apply(batch)
+            except DatabaseError:
+                logger.exception('Flushing %d buffered likes failed; will retry', len(batch))
+                self._requeue(batch)
+                return 0
+            finally:
+                with self._lock:
+                    self._inflight, self._inflight_deltas = {}, {}
+                    self._flushes += 1
+
+            for memory in touched:
+                leaderboard.record_like_change(memory)
+            mark_changed('memory_likes')
+            return len(batch)
+
+    def _apply(self, batch):
+        close_old_connections()
+        Like = Memory.likes.through
+        memory_ids = {memory_id for memory_id, _ in batch}
+
+        with transaction.atomic():
+            # Memories deleted since the toggle would fail the whole batch
+            existing = set(Memory.objects.filter(id__in=memory_ids).values_list('id', flat=True))
+            adds = [key for key, (_, desired) in batch.items() if desired and key[0] in existing]
+            removes = [key for key, (_, desired) in batch.items() if not desired and key[0] in existing]
+
+            if adds:
+                Like.objects.bulk_create(
+                    [Like(memory_id=memory_id, user_id=user_id) for memory_id, user_id in adds],
+                    ignore_conflicts=True,
+                )
+            for start in range(0, len(removes), DELETE_CHUNK):
+                pairs = removes[start:start + DELETE_CHUNK]
+                Like.objects.filter(
+                    reduce(or_, (Q(memory_id=memory_id, user_id=user_id) for memory_id, user_id in pairs))
+                ).delete()
+
+            counts = (
+                Like.objects.filter(memory_id=OuterRef('pk'))
+                .values('memory_id')
+                .annotate(total=Count('id'))
+                .values('total')
+            )
+            Memory.objects.filter(id__in=existing).update(likes_count=Coalesce(Subquery(counts), 0))
+            return list(
+                Memory.objects.filter(id__in=existing).only('id', 'likes_count', 'created_at', 'is_approved')
+            )
+
+    def _requeue(self, batch):
+        with self._lock:
+            merged = dict(batch)
+            for key, (_, desired) in self._pending.items():
+                base = merged[key][0] if key in merged else self._pending[key][0]
+                merged[key] = (base, desired)
+            self._pending = {key: entry for key, entry in merged.items() if entry[0] != entry[1]}
+            self._deltas = {}
+            for (memory_id, _), (base, desired) in self._pending.items():
+                self._deltas[memory_id] = self._deltas.get(memory_id, 0) + int(desired) - int(base)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='like-flusher', daemon=True)
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Unexpected error in the like flusher')
+
+
+_config = get_config()
+buffer = LikeBuffer(_config['FLUSH_INTERVAL'], _config['MAX_BATCH'])
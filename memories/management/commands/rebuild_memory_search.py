@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from memories import search
+from memories.models import Memory
+
+
+class Command(BaseCommand):
+    help = 'Recreate the memory full-text search index and reindex every memory'
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError('Full-text search needs the SQLite FTS5 backend')
+
+        search.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f'Reindexed {Memory.objects.count()} memories')
+        )
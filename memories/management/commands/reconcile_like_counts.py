@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from memories import leaderboard
+from memories.models import Memory
+from yearbook.conditional import bump_version
+
+
+class Command(BaseCommand):
+    help = 'Recompute Memory.likes_count from the likes table and fix any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report memories whose stored count is wrong',
+        )
+
+    def handle(self, *args, **options):
+        drifted = []
+        memories = Memory.objects.annotate(actual=Count('likes')).only('id', 'likes_count')
+        for memory in memories.iterator():
+            if memory.likes_count != memory.actual:
+                self.stdout.write(
+                    f'Memory {memory.id}: stored {memory.likes_count}, actual {memory.actual}'
+                )
+                memory.likes_count = memory.actual
+                drifted.append(memory)
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('All like counts are in sync'))
+            return
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'{len(drifted)} memories have drifted'))
+            return
+
+        with transaction.atomic():
+            Memory.objects.bulk_update(drifted, ['likes_count'], batch_size=500)
+        leaderboard.invalidate()
+        bump_version('memories')
+        self.stdout.write(self.style.SUCCESS(f'Fixed like counts for {len(drifted)} memories'))
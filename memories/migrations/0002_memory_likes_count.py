@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:06
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_likes_count(apps, schema_editor):
+    Memory = apps.get_model('memories', 'Memory')
+    Like = Memory.likes.through
+    counts = (
+        Like.objects.filter(memory_id=OuterRef('pk'))
+        .values('memory_id')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    Memory.objects.update(likes_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('memories', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='memory',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, help_text='Denormalized number of likes, kept in sync by MemoryViewSet.like'),
+        ),
+        migrations.RunPython(backfill_likes_count, migrations.RunPython.noop),
+    ]
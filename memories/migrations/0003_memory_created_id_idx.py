@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('memories', '0002_memory_likes_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='memory',
+            index=models.Index(fields=['-created_at', '-id'], name='memory_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('memories', '0004_memory_fts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='memory',
+            index=models.Index(fields=['-likes_count', '-created_at', '-id'], name='memory_likes_idx'),
+        ),
+    ]
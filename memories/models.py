@@ -18,14 +18,24 @@ class Memory(models.Model):
         related_name='liked_memories',
         blank=True
     )
+    likes_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Denormalized number of likes, kept in sync by MemoryViewSet.like"
+    )
 
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = 'Memories'
+        indexes = [
+            # Serves keyset pagination of the feed
+            models.Index(fields=['-created_at', '-id'], name='memory_created_id_idx'),
+            # Serves the top_liked leaderboard
+            models.Index(fields=['-likes_count', '-created_at', '-id'], name='memory_likes_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} by {self.created_by.username}"
 
     @property
     def like_count(self):
-        return self.likes.count()
+        return self.likes_count
@@ -0,0 +1,117 @@
+"""
+Full-text search over memory titles and descriptions.
+
+On SQLite the index is an FTS5 external-content table mirroring
+`memories_memory(title, description)`, kept in sync by triggers so that
+saves, queryset updates and bulk deletes are all covered. Other database
+backends fall back to `icontains` matching.
+"""
+import re
+
+from django.db import connection
+
+FTS_TABLE = 'memories_memory_fts'
+MAX_RESULTS = 500
+
+# Title matches weigh more than description matches in bm25()
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+SCHEMA_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description,
+        content='memories_memory', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON memories_memory BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON memories_memory BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, description ON memories_memory BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+]
+
+DROP_SQL = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def is_available(conn=connection):
+    return conn.vendor == 'sqlite'
+
+
+def create_schema(conn=connection):
+    """Create the FTS table and its triggers if they are missing."""
+    with conn.cursor() as cursor:
+        for statement in SCHEMA_SQL:
+            cursor.execute(statement)
+
+
+def drop_schema(conn=connection):
+    with conn.cursor() as cursor:
+        for statement in DROP_SQL:
+            cursor.execute(statement)
+
+
+def rebuild(conn=connection):
+    """Recreate any missing schema and reindex every memory from scratch."""
+    create_schema(conn)
+    with conn.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def build_match_query(text):
+    """
+    Turn free text into a safe FTS5 query: every word must match, and the
+    last word also matches as a prefix so results follow the user's typing.
+    """
+    tokens = _TOKEN_RE.findall(text)
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def ranked_ids(text, queryset=None, limit=MAX_RESULTS):
+    """
+    Return IDs of memories matching `text`, best match first. With a
+    `queryset`, only its rows are considered; the restriction is applied in
+    the same SQL statement, before the limit.
+    """
+    match = build_match_query(text)
+    if match is None:
+        return []
+    where, params = f"{FTS_TABLE} MATCH %s", [match]
+    if queryset is not None:
+        visible_sql, visible_params = queryset.order_by().values('id').query.sql_with_params()
+        where += f" AND rowid IN ({visible_sql})"
+        params += list(visible_params)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {where} "
+            f"ORDER BY bm25({FTS_TABLE}, %s, %s) LIMIT %s",
+            [*params, TITLE_WEIGHT, DESCRIPTION_WEIGHT, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
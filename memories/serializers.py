@@ -1,28 +1,58 @@
 from rest_framework import serializers
 from .models import Memory
 from django.conf import settings
+from django.db import models
+
+from yearbook.renditions import rendition_urls
+
+
+class MemoryListSerializer(serializers.ListSerializer):
+    """
+    Resolves `has_liked` for a whole page with a single query instead of
+    one `exists()` per memory.
+    """
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        memories = list(iterable)
+        
+        request = self.context.get('request')
+        if request and request.user.is_authenticated:
+            Like = Memory.likes.through
+            self.context['liked_memory_ids'] = set(
+                Like.objects.filter(
+                    user_id=request.user.id,
+                    memory_id__in=[memory.id for memory in memories]
+                ).values_list('memory_id', flat=True)
+            )
+        
+        return super().to_representation(memories)
 
 class MemorySerializer(serializers.ModelSerializer):
     created_by_username = serializers.ReadOnlyField(source='created_by.username')
     created_by_avatar = serializers.SerializerMethodField()
-    likes_count = serializers.SerializerMethodField()
+    likes_count = serializers.IntegerField(read_only=True)
     has_liked = serializers.SerializerMethodField()
     image_url = serializers.SerializerMethodField()
+    image_renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = Memory
         fields = [
-            'id', 'title', 'description', 'image', 'image_url', 
+            'id', 'title', 'description', 'image', 'image_url', 'image_renditions',
             'created_by', 'created_by_username', 'created_by_avatar',
             'created_at', 'is_approved', 'likes_count', 'has_liked'
         ]
         read_only_fields = ['created_by', 'is_approved']
+        list_serializer_class = MemoryListSerializer
 
     def get_image_url(self, obj):
         if obj.image:
             return self.context['request'].build_absolute_uri(obj.image.url)
         return None
 
+    def get_image_renditions(self, obj):
+        return rendition_urls(obj.image, self.context['request'])
+
     def get_created_by_avatar(self, obj):
         # Safely get the avatar URL if it exists
         if hasattr(obj.created_by, 'avatar') and obj.created_by.avatar:
@@ -33,16 +63,12 @@ class MemorySerializer(serializers.ModelSerializer):
                 pass
         return None
 
-    def get_likes_count(self, obj):
-        # Use the correct field name for likes count
-        if hasattr(obj, 'likes_count'):
-            return obj.likes_count
-        # Fallback to counting the related likes
-        return obj.likes.count() if hasattr(obj, 'likes') else 0
-
     def get_has_liked(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
+            liked_ids = self.context.get('liked_memory_ids')
+            if liked_ids is not None:
+                return obj.id in liked_ids
             return obj.likes.filter(id=request.user.id).exists()
         return False
 
@@ -0,0 +1,37 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from yearbook.conditional import bump_version
+from yearbook.media_cleanup import file_names, schedule_delete
+
+from . import leaderboard
+from .models import Memory
+
+
+@receiver(post_save, sender=Memory)
+@receiver(post_delete, sender=Memory)
+def invalidate_leaderboard(sender, instance, **kwargs):
+    """
+    Signal handler to drop the cached leaderboard when a memory is created,
+    edited, approved or deleted. Like toggles drop it through
+    leaderboard.record_like_change when they can change the ranking.
+    """
+    leaderboard.invalidate()
+
+
+@receiver(post_save, sender=Memory)
+@receiver(post_delete, sender=Memory)
+def bump_memories_version(sender, instance, **kwargs):
+    """
+    Signal handler to expire conditional GET validators of the memories feed.
+    """
+    bump_version('memories')
+
+
+@receiver(post_delete, sender=Memory)
+def delete_memory_image(sender, instance, **kwargs):
+    """
+    Signal handler to remove a deleted memory's image in the background
+    once the delete commits.
+    """
+    schedule_delete(*file_names(instance))
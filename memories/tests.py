@@ -1,3 +1,255 @@
-from django.test import TestCase
+import datetime
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from yearbook.conditional import COALESCE_INTERVAL
+
+from . import search
+from .models import Memory
+
+User = get_user_model()
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+FEED_URL = '/api/memories/'
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class MemoryTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('author', is_approved=True)
+        self.client = APIClient()
+        self.now = timezone.now()
+
+    def memory(self, title='Memory', minutes_ago=0, **fields):
+        fields.setdefault('is_approved', True)
+        return Memory.objects.create(
+            title=title,
+            description=fields.pop('description', 'A day to remember'),
+            created_by=fields.pop('created_by', self.author),
+            created_at=self.now - datetime.timedelta(minutes=minutes_ago),
+            **fields,
+        )
+
+
+class KeysetPaginationTests(MemoryTestCase):
+    def pages(self, url, **params):
+        ids = []
+        response = self.client.get(url, {'pagination': 'cursor', **params})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            ids.append([item['id'] for item in response.data['results']])
+            if response.data['next'] is None:
+                return ids
+            response = self.client.get(response.data['next'])
+
+    def test_pages_walk_the_feed_newest_first(self):
+        memories = [self.memory(f'Memory {n}', minutes_ago=n) for n in range(7)]
+        self.memory('Hidden', is_approved=False)
+
+        pages = self.pages(FEED_URL, page_size=3)
+
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual(sum(pages, []), [memory.id for memory in memories])
+
+    def test_equal_timestamps_are_ordered_by_id(self):
+        same_time = [self.memory(f'Memory {n}', minutes_ago=5) for n in range(4)]
+
+        pages = self.pages(FEED_URL, page_size=3)
+
+        self.assertEqual(sum(pages, []), sorted((memory.id for memory in same_time), reverse=True))
+
+    def test_new_rows_do_not_shift_later_pages(self):
+        older = [self.memory(f'Memory {n}', minutes_ago=n + 1) for n in range(4)]
+        first = self.client.get(FEED_URL, {'pagination': 'cursor', 'page_size': 2})
+
+        self.memory('Newest')
+        second = self.client.get(first.data['next'])
+
+        self.assertEqual([item['id'] for item in second.data['results']], [older[2].id, older[3].id])
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get(FEED_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_default_pagination_is_unchanged(self):
+        self.memory()
+
+        response = self.client.get(FEED_URL)
+
+        self.assertEqual(response.data['count'], 1)
+
+
+class LeaderboardTests(MemoryTestCase):
+    def top_liked(self, client=None):
+        response = (client or self.client).get(f'{FEED_URL}top_liked/')
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.data]
+
+    def like(self, memory, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        # The cache is updated once the like commits
+        with self.captureOnCommitCallbacks(execute=True):
+            return client.post(f'{FEED_URL}{memory.id}/like/')
+
+    def test_ranks_by_likes_then_recency(self):
+        older = self.memory('Older', minutes_ago=10, likes_count=3)
+        newer = self.memory('Newer', minutes_ago=1, likes_count=3)
+        best = self.memory('Best', minutes_ago=20, likes_count=9)
+        self.memory('Hidden', likes_count=50, is_approved=False)
+
+        self.assertEqual(self.top_liked(), [best.id, newer.id, older.id])
+
+    def test_visibility_per_user(self):
+        approved = self.memory('Approved', likes_count=2)
+        own = self.memory('Own pending', likes_count=5, is_approved=False)
+        other = self.memory(
+            'Other pending', likes_count=7, is_approved=False,
+            created_by=User.objects.create_user('other', is_approved=True),
+        )
+        author = APIClient()
+        author.force_authenticate(self.author)
+        staff = APIClient()
+        staff.force_authenticate(User.objects.create_user('staff', is_staff=True, is_approved=True))
+
+        self.assertEqual(self.top_liked(author), [own.id, approved.id])
+        self.assertEqual(self.top_liked(staff), [other.id, own.id, approved.id])
+
+    def test_like_that_changes_the_ranking_is_seen(self):
+        first = self.memory('First', likes_count=1)
+        second = self.memory('Second', minutes_ago=1)
+        self.assertEqual(self.top_liked(), [first.id, second.id])
+
+        for name in ['fan1', 'fan2']:
+            self.assertEqual(self.like(second, User.objects.create_user(name, is_approved=True)).status_code, 200)
+
+        self.assertEqual(self.top_liked(), [second.id, first.id])
+
+    def test_like_below_a_full_board_keeps_it_cached(self):
+        from .leaderboard import CACHE_KEYS, LEADERBOARD_SIZE
+        for n in range(LEADERBOARD_SIZE):
+            self.memory(f'Popular {n}', likes_count=10)
+        low = self.memory('Low', minutes_ago=60)
+        self.top_liked()
+
+        self.like(low, User.objects.create_user('fan', is_approved=True))
+
+        self.assertIsNotNone(cache.get(CACHE_KEYS['approved']))
+        self.assertNotIn(low.id, self.top_liked())
+
+
+class SearchTests(MemoryTestCase):
+    def search(self, text, client=None):
+        response = (client or self.client).get(FEED_URL, {'q': text})
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.data['results']]
+
+    def test_title_matches_rank_first(self):
+        in_description = self.memory('Lunch', description='We went to the beach after class')
+        in_title = self.memory('Beach day', description='Sun and sand')
+        self.memory('Library', description='Quiet study session')
+
+        self.assertEqual(self.search('beach'), [in_title.id, in_description.id])
+
+    def test_last_word_matches_as_prefix(self):
+        graduation = self.memory('Graduation party')
+
+        self.assertEqual(self.search('gradu'), [graduation.id])
+        self.assertEqual(self.search('party gradu'), [graduation.id])
+
+    def test_index_follows_edits_and_deletes(self):
+        memory = self.memory('Science fair')
+        Memory.objects.filter(id=memory.id).update(title='Art fair')
+        gone = self.memory('Science club')
+        gone.delete()
+
+        self.assertEqual(self.search('science'), [])
+        self.assertEqual(self.search('art'), [memory.id])
+
+    def test_query_syntax_is_escaped(self):
+        memory = self.memory('Prom night')
+
+        self.assertEqual(self.search('prom" night*)('), [memory.id])
+        self.assertEqual(self.search('"*'), [])
+
+    def test_only_visible_memories_are_found(self):
+        visible = self.memory('Field trip')
+        own_pending = self.memory('Field day', is_approved=False)
+        self.memory(
+            'Field hockey', is_approved=False,
+            created_by=User.objects.create_user('other', is_approved=True),
+        )
+        author = APIClient()
+        author.force_authenticate(self.author)
+
+        self.assertEqual(self.search('field'), [visible.id])
+        self.assertCountEqual(self.search('field', author), [visible.id, own_pending.id])
+
+    def test_hidden_matches_do_not_use_up_the_limit(self):
+        for n in range(3):
+            self.memory('Talent show', is_approved=False)
+        visible = self.memory('Talent show', description='Approved')
+
+        ids = search.ranked_ids('talent', queryset=Memory.objects.filter(is_approved=True), limit=2)
+
+        self.assertEqual(ids, [visible.id])
+
+
+class ConditionalFeedTests(MemoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.memory('Prom night')
+
+    def revalidate(self, response, client=None):
+        return (client or self.client).get(FEED_URL, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_feed_is_not_modified_without_queries(self):
+        first = self.client.get(FEED_URL)
+
+        with self.assertNumQueries(0):
+            second = self.revalidate(first)
+
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertIn('Authorization', second['Vary'])
+
+    def test_edit_changes_the_etag(self):
+        first = self.client.get(FEED_URL)
+
+        self.memory('Senior trip')
+
+        self.assertEqual(self.revalidate(first).status_code, 200)
+
+    def test_etag_depends_on_the_user(self):
+        author = APIClient()
+        author.force_authenticate(self.author)
+        anonymous = self.client.get(FEED_URL)
+
+        self.assertEqual(self.revalidate(anonymous, author).status_code, 200)
+
+    def test_likes_refresh_the_etag_at_most_once_per_interval(self):
+        memory = Memory.objects.get()
+        fan = APIClient()
+        fan.force_authenticate(User.objects.create_user('fan', is_approved=True))
+        first = self.client.get(FEED_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            fan.post(f'{FEED_URL}{memory.id}/like/')
+        self.assertEqual(self.revalidate(first).status_code, 304)
+
+        later = time.time() + COALESCE_INTERVAL
+        with mock.patch('yearbook.conditional.time.time', return_value=later):
+            refreshed = self.revalidate(first)
+            self.assertEqual(refreshed.status_code, 200)
+            self.assertEqual(refreshed.data['results'][0]['likes_count'], 1)
+            # Nothing changed since, so the new copy validates again
+            self.assertEqual(self.revalidate(refreshed).status_code, 304)
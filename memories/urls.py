@@ -1,7 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from . import views
-from .views_admin import PendingMemoriesView
+from .views_admin import PendingMemoriesView, BulkMemoryModerationView
 
 router = DefaultRouter()
 # Register viewsets without the 'memories' prefix since it's already in the main URLs
@@ -17,5 +17,6 @@ urlpatterns = [
     
     # Admin endpoints
     path('admin/pending-memories/', PendingMemoriesView.as_view(), name='pending-memories'),
+    path('admin/pending-memories/bulk/', BulkMemoryModerationView.as_view(), name='bulk-moderate-memories'),
     path('admin/pending-memories/<int:memory_id>/', PendingMemoriesView.as_view(), name='manage-memory'),
 ]
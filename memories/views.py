@@ -1,14 +1,23 @@
-from rest_framework import viewsets, permissions, status
+import logging
+
+from rest_framework import viewsets, permissions, serializers, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.parsers import FormParser
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated, IsAdminUser
 from rest_framework_simplejwt import authentication as jwt_authentication
-from django.db.models import Count, Q
-from django.db import models
+from django.db.models import F, Q
+from django.db import models, transaction
+from yearbook.pagination import KeysetPaginationMixin
+from yearbook.parsers import UploadLimitMultiPartParser
+from yearbook.conditional import conditional_list, mark_changed
+from yearbook.tracing import get_trace
+from . import leaderboard, like_buffer, search
 from .models import Memory
 from .serializers import MemorySerializer
 
+logger = logging.getLogger(__name__)
+
 class IsOwnerOrReadOnly(permissions.BasePermission):
     """Custom permission to only allow owners to edit their memories."""
     def has_object_permission(self, request, view, obj):
@@ -16,7 +25,7 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
             return True
         return obj.created_by == request.user
 
-class MemoryViewSet(viewsets.ModelViewSet):
+class MemoryViewSet(KeysetPaginationMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows memories to be viewed or edited.
     """
@@ -26,7 +35,8 @@ class MemoryViewSet(viewsets.ModelViewSet):
     # Set default authentication and permission classes
     authentication_classes = [jwt_authentication.JWTAuthentication]
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
-    parser_classes = [MultiPartParser, FormParser]  # Add this line to handle file uploads
+    parser_classes = [UploadLimitMultiPartParser, FormParser]  # Add this line to handle file uploads
+    max_upload_size = 5 * 1024 * 1024  # 5MB limit, enforced while the upload streams
     
     def initialize_request(self, request, *args, **kwargs):
         """Initialize the request and set the action attribute."""
@@ -54,98 +64,81 @@ class MemoryViewSet(viewsets.ModelViewSet):
         """
         # Default to 'list' if action is not set
         action = getattr(self, 'action', 'list')
-        
-        print(f"\n=== GET_PERMISSIONS ===")
-        print(f"Action: {action}")
-        print(f"Request method: {getattr(self, 'request', None) and self.request.method or 'N/A'}")
-        print(f"User: {getattr(self, 'request', None) and self.request.user or 'N/A'}")
-        print(f"Authenticated: {getattr(self, 'request', None) and self.request.user.is_authenticated or 'N/A'}")
+        trace = get_trace(getattr(self, 'request', None))
         
         # For list and retrieve, allow any (handled by IsAuthenticatedOrReadOnly)
         if action in ['list', 'retrieve']:
-            print("Using default permissions (IsAuthenticatedOrReadOnly)")
+            trace.debug('get_permissions', action=action, permissions='IsAuthenticatedOrReadOnly')
             return super().get_permissions()
             
         # For create, update, partial_update, destroy, like actions, require authentication
-        print("Using IsAuthenticated permission")
+        trace.debug('get_permissions', action=action, permissions='IsAuthenticated')
         return [permissions.IsAuthenticated()]
     
     def get_authenticators(self):
         # Default to 'list' if action is not set
         action = getattr(self, 'action', 'list')
-        
-        print(f"\n=== GET_AUTHENTICATORS ===")
-        print(f"Action: {action}")
-        print(f"Request method: {getattr(self, 'request', None) and self.request.method or 'N/A'}")
+        get_trace(getattr(self, 'request', None)).debug('get_authenticators', action=action)
         
         # Always use JWT authentication for all actions
         # The permission classes will handle read vs write access
         return [jwt_authentication.JWTAuthentication()]
 
     def get_queryset(self):
-        print("\n=== GET_QUERYSET ===")
-        print(f"Action: {getattr(self, 'action', 'unknown')}")
-        print(f"User: {self.request.user} (ID: {self.request.user.id if self.request.user.is_authenticated else 'anonymous'})")
-        print(f"Authenticated: {self.request.user.is_authenticated}")
-        print(f"Staff: {self.request.user.is_staff if self.request.user.is_authenticated else 'N/A'}")
-        print(f"Request method: {self.request.method}")
-        
-        queryset = Memory.objects.all()
+        trace = get_trace(self.request)
+        queryset = Memory.objects.select_related('created_by')
         user = self.request.user
         
         # For unauthenticated users, only show approved memories
         if not user.is_authenticated:
-            print("Returning only approved memories (unauthenticated user)")
+            trace.debug('get_queryset', action=getattr(self, 'action', None), visibility='approved')
             return queryset.filter(is_approved=True).order_by('-created_at')
             
         # For authenticated non-staff users, show approved memories + their own unapproved memories
         if not user.is_staff:
-            print("Returning approved + user's unapproved memories")
+            trace.debug('get_queryset', action=getattr(self, 'action', None), visibility='approved+own', user_id=user.id)
             return queryset.filter(
                 models.Q(is_approved=True) | 
                 models.Q(created_by=user, is_approved=False)
             ).order_by('-created_at')
             
         # For staff users, show all memories
-        print("Returning all memories (staff user)")
+        trace.debug('get_queryset', action=getattr(self, 'action', None), visibility='all', user_id=user.id)
         return queryset.order_by('-created_at')
 
+    @conditional_list('memories', 'memory_likes', 'users')
     def list(self, request, *args, **kwargs):
-        print("\n=== LIST MEMORIES ===")
-        print(f"User: {request.user} (ID: {request.user.id if request.user.is_authenticated else 'anonymous'})")
-        print(f"Authenticated: {request.user.is_authenticated}")
-        print(f"Staff: {request.user.is_staff if request.user.is_authenticated else 'N/A'}")
-        print(f"Headers: {dict(request.headers)}")
-        print(f"Query params: {request.query_params}")
+        trace = get_trace(request)
+        if trace.enabled:
+            trace.info(
+                'list',
+                user_id=request.user.id,
+                query_params=request.query_params.dict(),
+            )
         
-        # Log the queryset that will be used
-        queryset = self.filter_queryset(self.get_queryset())
-        print(f"Queryset count: {queryset.count()}")
+        query = request.query_params.get('q', '').strip()
+        if query:
+            with trace.span('list.search'):
+                return self.search(request, query)
         
         # Call the parent list method to handle pagination and serialization
-        response = super().list(request, *args, **kwargs)
-        
-        print(f"Response status: {response.status_code}")
-        print(f"Response data count: {len(response.data) if hasattr(response, 'data') and isinstance(response.data, list) else 'N/A'}")
-        
-        return response
+        with trace.span('list.render'):
+            return super().list(request, *args, **kwargs)
 
     def create(self, request, *args, **kwargs):
-        # Debug: Log request headers and authentication status
-        print("\n=== CREATE MEMORY REQUEST ===")
-        print(f"Request method: {request.method}")
-        print(f"User authenticated: {request.user.is_authenticated}")
-        print(f"User: {request.user}")
-        print(f"Request user ID: {getattr(request.user, 'id', 'N/A')}")
-        print(f"Request user class: {request.user.__class__.__name__}")
-        print(f"Request auth: {request.auth}")
-        print(f"Request headers: {dict(request.headers)}")
-        print(f"Request data keys: {list(request.data.keys()) if hasattr(request, 'data') else 'No data'}")
+        trace = get_trace(request)
+        if trace.enabled:
+            # Header names only; values include the bearer token
+            trace.debug(
+                'create.request',
+                user_id=request.user.id,
+                headers=sorted(request.headers.keys()),
+                data_keys=list(request.data.keys()),
+            )
         
         # Check authentication first
         if not request.user.is_authenticated:
-            print("\n=== AUTHENTICATION FAILED ===")
-            print("User is not authenticated")
+            trace.info('create.unauthenticated')
             return Response(
                 {
                     'error': 'Authentication required',
@@ -155,37 +148,21 @@ class MemoryViewSet(viewsets.ModelViewSet):
                 headers={'WWW-Authenticate': 'Bearer'}
             )
         
-        # Check file size before processing
-        if 'image' in request.FILES:
-            image = request.FILES['image']
-            # 5MB limit
-            max_size = 5 * 1024 * 1024
-            if image.size > max_size:
-                return Response(
-                    {'error': 'File size too large. Maximum size is 5MB.'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-        
-        # Debug: Log request data
-        print(f"Request data: {request.data}")
-        print(f"Request files: {request.FILES}")
+        # Parse the body up front so oversized or malformed uploads are
+        # answered by the parser (413/400) rather than the catch-all below
+        data = request.data
         
         try:
             # Initialize serializer with request data and context
-            serializer = self.get_serializer(data=request.data)
-            serializer.is_valid(raise_exception=True)
-            
-            # Debug: Log valid data
-            print(f"Validated data: {serializer.validated_data}")
+            serializer = self.get_serializer(data=data)
+            with trace.span('create.validate'):
+                serializer.is_valid(raise_exception=True)
             
             # Create the memory
-            self.perform_create(serializer)
+            with trace.span('create.save'):
+                self.perform_create(serializer)
             headers = self.get_success_headers(serializer.data)
             
-            # Debug: Log success
-            print("Memory created successfully")
-            print("======================\n")
-            
             return Response(
                 serializer.data, 
                 status=status.HTTP_201_CREATED, 
@@ -193,26 +170,42 @@ class MemoryViewSet(viewsets.ModelViewSet):
             )
             
         except serializers.ValidationError as e:
-            # Debug: Log validation error
-            print(f"Validation error: {e}")
-            print("======================\n")
+            trace.info('create.invalid', errors=str(e))
             return Response(
                 {'error': 'Validation error', 'details': str(e)},
                 status=status.HTTP_400_BAD_REQUEST
             )
             
         except Exception as e:
-            # Debug: Log unexpected error with traceback
-            import traceback
-            error_traceback = traceback.format_exc()
-            print(f"Unexpected error: {str(e)}")
-            print(f"Traceback: {error_traceback}")
-            print("======================\n")
+            logger.exception('Unexpected error while creating a memory')
+            trace.info('create.error', error=str(e))
             return Response(
                 {'error': 'An error occurred while creating the memory', 'details': str(e) if str(e) else 'Unknown error'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    def search(self, request, query):
+        """
+        Full-text search (`?q=`) ranked by relevance, limited to the memories
+        the user is allowed to see.
+        """
+        queryset = self.get_queryset()
+        
+        if search.is_available():
+            ranked = search.ranked_ids(query, queryset=queryset)
+        else:
+            ranked = list(
+                queryset.filter(Q(title__icontains=query) | Q(description__icontains=query))
+                .values_list('id', flat=True)[:search.MAX_RESULTS]
+            )
+        
+        # Results are a bounded, ranked list, so page through it by number
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(ranked, request, view=self)
+        memories = queryset.in_bulk(page)
+        serializer = self.get_serializer([memories[memory_id] for memory_id in page], many=True)
+        return paginator.get_paginated_response(serializer.data)
+
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
@@ -220,25 +213,45 @@ class MemoryViewSet(viewsets.ModelViewSet):
     def like(self, request, pk=None):
         memory = self.get_object()
         user = request.user
+        Like = Memory.likes.through
         
-        if memory.likes.filter(id=user.id).exists():
-            memory.likes.remove(user)
-            liked = False
-        else:
-            memory.likes.add(user)
-            liked = True
+        # Under write contention, buffer the toggle and answer optimistically
+        if like_buffer.is_enabled():
+            liked, likes_count = like_buffer.buffer.toggle(memory, user.id)
+            return Response({
+                'liked': liked,
+                'likes_count': likes_count
+            })
+        
+        with transaction.atomic():
+            # Toggle via the through table so the row change and the
+            # counter update happen in the same transaction
+            removed, _ = Like.objects.filter(memory_id=memory.id, user_id=user.id).delete()
+            if removed:
+                Memory.objects.filter(id=memory.id).update(likes_count=F('likes_count') - removed)
+                liked = False
+            else:
+                _, created = Like.objects.get_or_create(memory_id=memory.id, user_id=user.id)
+                if created:
+                    Memory.objects.filter(id=memory.id).update(likes_count=F('likes_count') + 1)
+                liked = True
+            
+            memory.likes_count = Memory.objects.filter(id=memory.id).values_list('likes_count', flat=True).get()
+            transaction.on_commit(lambda: leaderboard.record_like_change(memory))
+            # Like counts refresh the feed validators at most once a minute
+            transaction.on_commit(lambda: mark_changed('memory_likes'))
             
         return Response({
             'liked': liked,
-            'likes_count': memory.like_count
+            'likes_count': memory.likes_count
         })
 
     @action(detail=False, methods=['get'])
     def top_liked(self, request):
         """Get top 10 most liked memories"""
-        queryset = self.get_queryset().annotate(
-            likes_count=Count('likes')
-        ).order_by('-likes_count')[:10]
+        ids = leaderboard.top_liked_ids(request.user)
+        memories = self.get_queryset().in_bulk(ids)
+        queryset = [memories[memory_id] for memory_id in ids if memory_id in memories]
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
@@ -246,6 +259,10 @@ class MemoryViewSet(viewsets.ModelViewSet):
     def my_memories(self, request):
         """Get memories created by the current user"""
         queryset = self.get_queryset().filter(created_by=request.user)
+        if self.keyset_pagination_class.is_requested(request):
+            page = self.paginate_queryset(queryset)
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
@@ -258,7 +275,7 @@ class AdminMemoryViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAdminUser]
     
     def get_queryset(self):
-        return Memory.objects.all().order_by('-created_at')
+        return Memory.objects.select_related('created_by').order_by('-created_at')
 
     @action(detail=True, methods=['post'])
     def approve(self, request, pk=None):
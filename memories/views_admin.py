@@ -3,6 +3,10 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.decorators import permission_classes
+from django.db import transaction
+from yearbook.conditional import bump_version
+from yearbook.serializers import BulkModerationSerializer
+from . import leaderboard
 from .models import Memory
 from .serializers import MemorySerializer
 
@@ -78,3 +82,54 @@ class PendingMemoriesView(APIView):
                 {'error': str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+class BulkMemoryModerationView(APIView):
+    """
+    API endpoint to approve or reject many memories in one request
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    
+    def post(self, request):
+        """
+        Approve or reject a list of memories.
+        Expects {"ids": [...], "action": "approve" | "reject"} and reports
+        the outcome for every requested ID.
+        """
+        serializer = BulkModerationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        action = serializer.validated_data['action']
+        
+        with transaction.atomic():
+            approved = dict(
+                Memory.objects.filter(id__in=ids).values_list('id', 'is_approved')
+            )
+            
+            if action == 'approve':
+                pending = [memory_id for memory_id, is_approved in approved.items() if not is_approved]
+                Memory.objects.filter(id__in=pending).update(is_approved=True)
+                outcomes = {memory_id: 'approved' for memory_id in pending}
+                outcomes.update({
+                    memory_id: 'already_approved'
+                    for memory_id, is_approved in approved.items() if is_approved
+                })
+            else:
+                Memory.objects.filter(id__in=list(approved)).delete()
+                outcomes = {memory_id: 'rejected' for memory_id in approved}
+        
+        # update() skips post_save, so the cached leaderboard and feed
+        # validators won't see approvals on their own
+        if action == 'approve':
+            transaction.on_commit(leaderboard.invalidate)
+            transaction.on_commit(lambda: bump_version('memories'))
+        
+        results = [{'id': memory_id, 'status': outcomes.get(memory_id, 'not_found')} for memory_id in ids]
+        return Response(
+            {
+                'action': action,
+                'processed': len(outcomes),
+                'results': results,
+            },
+            status=status.HTTP_200_OK
+        )
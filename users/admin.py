@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext_lazy as _
+from yearbook.conditional import bump_version
 from .models import User, UserProfile
 
 
@@ -46,11 +47,13 @@ class UserProfileAdmin(admin.ModelAdmin):
     
     def approve_profiles(self, request, queryset):
         updated = queryset.update(is_approved=True)
+        bump_version('users')
         self.message_user(request, f"{updated} profiles were successfully approved.")
     approve_profiles.short_description = "Approve selected profiles"
     
     def unapprove_profiles(self, request, queryset):
         updated = queryset.update(is_approved=False)
+        bump_version('users')
         self.message_user(request, f"{updated} profiles were successfully unapproved.")
     unapprove_profiles.short_description = "Unapprove selected profiles"
     readonly_fields = ('created_at', 'updated_at')
@@ -0,0 +1,207 @@
+"""
+Indexed search over the classmate directory.
+
+On SQLite two FTS5 tables mirror each profile's username, first and last
+name (from `users_user`) and nickname, keyed by the profile id:
+
+- a word index with prefix indexes, which answers typeahead queries
+  ("jo", "jo sm") ranked with bm25();
+- a trigram index, which adds matches inside words ("mith" finds "Smith")
+  once the prefix matches run out.
+
+Both are kept in sync by triggers on the profile and user tables, so
+saves, queryset updates and deletes are all covered. Other database
+backends fall back to `icontains` matching.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from rest_framework.filters import BaseFilterBackend
+
+WORD_TABLE = 'users_directory_fts'
+TRIGRAM_TABLE = 'users_directory_trigram'
+MAX_RESULTS = 200
+# A short prefix can match most of the directory. Only the first this many
+# matches (in profile id order) are scored, which keeps typeahead fast at any
+# directory size; past that the ranking is approximate, not the global best
+CANDIDATES = 1000
+
+COLUMNS = ['username', 'first_name', 'last_name', 'nickname']
+# bm25() weights, in column order: names weigh more than handles
+WEIGHTS = [2.0, 4.0, 4.0, 3.0]
+
+TOKENIZERS = {
+    WORD_TABLE: "tokenize='unicode61 remove_diacritics 2', prefix='1 2 3'",
+    TRIGRAM_TABLE: "tokenize='trigram'",
+}
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _table_sql(table):
+    columns = ', '.join(COLUMNS)
+    return [
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5(
+            {columns}, {TOKENIZERS[table]}
+        )
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_profile_ai AFTER INSERT ON users_userprofile BEGIN
+            INSERT INTO {table}(rowid, {columns})
+            SELECT new.id, u.username, u.first_name, u.last_name, new.nickname
+            FROM users_user u WHERE u.id = new.user_id;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_profile_ad AFTER DELETE ON users_userprofile BEGIN
+            DELETE FROM {table} WHERE rowid = old.id;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_profile_au AFTER UPDATE OF user_id, nickname ON users_userprofile
+        WHEN old.user_id IS NOT new.user_id OR old.nickname IS NOT new.nickname BEGIN
+            DELETE FROM {table} WHERE rowid = old.id;
+            INSERT INTO {table}(rowid, {columns})
+            SELECT new.id, u.username, u.first_name, u.last_name, new.nickname
+            FROM users_user u WHERE u.id = new.user_id;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_user_au AFTER UPDATE OF username, first_name, last_name ON users_user
+        WHEN old.username IS NOT new.username
+            OR old.first_name IS NOT new.first_name
+            OR old.last_name IS NOT new.last_name BEGIN
+            DELETE FROM {table} WHERE rowid IN (SELECT id FROM users_userprofile WHERE user_id = new.id);
+            INSERT INTO {table}(rowid, {columns})
+            SELECT p.id, new.username, new.first_name, new.last_name, p.nickname
+            FROM users_userprofile p WHERE p.user_id = new.id;
+        END
+        """,
+    ]
+
+
+def _drop_sql(table):
+    return [
+        f'DROP TRIGGER IF EXISTS {table}_profile_ai',
+        f'DROP TRIGGER IF EXISTS {table}_profile_ad',
+        f'DROP TRIGGER IF EXISTS {table}_profile_au',
+        f'DROP TRIGGER IF EXISTS {table}_user_au',
+        f'DROP TABLE IF EXISTS {table}',
+    ]
+
+
+def is_available(conn=connection):
+    # The trigram tokenizer needs SQLite 3.34
+    return conn.vendor == 'sqlite' and conn.Database.sqlite_version_info >= (3, 34, 0)
+
+
+def create_schema(conn=connection):
+    """Create the FTS tables and their triggers if they are missing."""
+    with conn.cursor() as cursor:
+        for table in TOKENIZERS:
+            for statement in _table_sql(table):
+                cursor.execute(statement)
+
+
+def drop_schema(conn=connection):
+    with conn.cursor() as cursor:
+        for table in TOKENIZERS:
+            for statement in _drop_sql(table):
+                cursor.execute(statement)
+
+
+def rebuild(conn=connection):
+    """Recreate any missing schema and reindex every profile from scratch."""
+    create_schema(conn)
+    columns = ', '.join(COLUMNS)
+    with conn.cursor() as cursor:
+        for table in TOKENIZERS:
+            cursor.execute(f'DELETE FROM {table}')
+            cursor.execute(
+                f"INSERT INTO {table}(rowid, {columns}) "
+                f"SELECT p.id, u.username, u.first_name, u.last_name, p.nickname "
+                f"FROM users_userprofile p JOIN users_user u ON u.id = p.user_id"
+            )
+
+
+def build_match_query(text):
+    """
+    Turn free text into a safe FTS5 query where every word must start some
+    word of the entry, so "jo sm" finds "John Smith".
+    """
+    tokens = _TOKEN_RE.findall(text)
+    if not tokens:
+        return None
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def build_trigram_query(text):
+    """Every word of three or more characters must appear somewhere."""
+    tokens = [token for token in _TOKEN_RE.findall(text) if len(token) >= 3]
+    if not tokens:
+        return None
+    return ' '.join(f'"{token}"' for token in tokens)
+
+
+def _match(cursor, table, match, limit):
+    weights = ', '.join(['%s'] * len(WEIGHTS))
+    cursor.execute(
+        f"SELECT rowid FROM ("
+        f"SELECT rowid, bm25({table}, {weights}) AS score FROM {table} "
+        f"WHERE {table} MATCH %s LIMIT %s"
+        f") ORDER BY score LIMIT %s",
+        [*WEIGHTS, match, max(CANDIDATES, limit), limit],
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def ranked_ids(text, limit=MAX_RESULTS):
+    """Return IDs of profiles matching `text`: word prefix matches first, then substring matches."""
+    ids = []
+    with connection.cursor() as cursor:
+        match = build_match_query(text)
+        if match is not None:
+            ids = _match(cursor, WORD_TABLE, match, limit)
+
+        match = build_trigram_query(text)
+        if match is not None and len(ids) < limit:
+            seen = set(ids)
+            extra = _match(cursor, TRIGRAM_TABLE, match, limit + len(ids))
+            ids += [profile_id for profile_id in extra if profile_id not in seen][:limit - len(ids)]
+    return ids
+
+
+def search(queryset, text, limit=MAX_RESULTS):
+    """Filter a UserProfile queryset to the profiles matching `text`, best match first."""
+    if not is_available():
+        return queryset.filter(
+            Q(user__username__icontains=text) |
+            Q(user__first_name__icontains=text) |
+            Q(user__last_name__icontains=text) |
+            Q(nickname__icontains=text)
+        )
+    ids = ranked_ids(text, limit)
+    if not ids:
+        return queryset.none()
+    return queryset.filter(id__in=ids).order_by(
+        Case(
+            *[When(id=profile_id, then=Value(position)) for position, profile_id in enumerate(ids)],
+            output_field=IntegerField(),
+        )
+    )
+
+
+class DirectorySearchFilter(BaseFilterBackend):
+    """
+    Filter backend answering `?search=` from the directory index, best
+    match first (approximate beyond `CANDIDATES` matches).
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '').strip()
+        if not text:
+            return queryset
+        return search(queryset, text)
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from users import directory
+from users.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = 'Recreate the classmate directory search index and reindex every profile'
+
+    def handle(self, *args, **options):
+        if not directory.is_available():
+            raise CommandError('Directory search needs SQLite 3.34 or newer with FTS5')
+
+        directory.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f'Reindexed {UserProfile.objects.count()} profiles')
+        )
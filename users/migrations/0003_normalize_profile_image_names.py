@@ -0,0 +1,25 @@
+from django.db import migrations
+
+from users.utils import normalize_profile_image_name
+
+
+def normalize_image_names(apps, schema_editor):
+    UserProfile = apps.get_model('users', 'UserProfile')
+    changed = []
+    for profile in UserProfile.objects.exclude(image='').exclude(image__isnull=True).only('id', 'image').iterator():
+        name = normalize_profile_image_name(profile.image.name)
+        if name != profile.image.name:
+            profile.image.name = name
+            changed.append(profile)
+    UserProfile.objects.bulk_update(changed, ['image'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_userprofile_is_approved'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_image_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,97 @@
+from django.db import migrations
+
+# The schema as of this migration. It is frozen here rather than imported
+# from users.directory, so later changes to that module can't alter what
+# this migration does.
+WORD_TABLE = 'users_directory_fts'
+TRIGRAM_TABLE = 'users_directory_trigram'
+COLUMNS = 'username, first_name, last_name, nickname'
+TOKENIZERS = {
+    WORD_TABLE: "tokenize='unicode61 remove_diacritics 2', prefix='1 2 3'",
+    TRIGRAM_TABLE: "tokenize='trigram'",
+}
+
+
+def table_sql(table):
+    return [
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5(
+            {COLUMNS}, {TOKENIZERS[table]}
+        )
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_profile_ai AFTER INSERT ON users_userprofile BEGIN
+            INSERT INTO {table}(rowid, {COLUMNS})
+            SELECT new.id, u.username, u.first_name, u.last_name, new.nickname
+            FROM users_user u WHERE u.id = new.user_id;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_profile_ad AFTER DELETE ON users_userprofile BEGIN
+            DELETE FROM {table} WHERE rowid = old.id;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_profile_au AFTER UPDATE OF user_id, nickname ON users_userprofile
+        WHEN old.user_id IS NOT new.user_id OR old.nickname IS NOT new.nickname BEGIN
+            DELETE FROM {table} WHERE rowid = old.id;
+            INSERT INTO {table}(rowid, {COLUMNS})
+            SELECT new.id, u.username, u.first_name, u.last_name, new.nickname
+            FROM users_user u WHERE u.id = new.user_id;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_user_au AFTER UPDATE OF username, first_name, last_name ON users_user
+        WHEN old.username IS NOT new.username
+            OR old.first_name IS NOT new.first_name
+            OR old.last_name IS NOT new.last_name BEGIN
+            DELETE FROM {table} WHERE rowid IN (SELECT id FROM users_userprofile WHERE user_id = new.id);
+            INSERT INTO {table}(rowid, {COLUMNS})
+            SELECT p.id, new.username, new.first_name, new.last_name, p.nickname
+            FROM users_userprofile p WHERE p.user_id = new.id;
+        END
+        """,
+        f"DELETE FROM {table}",
+        f"""
+        INSERT INTO {table}(rowid, {COLUMNS})
+        SELECT p.id, u.username, u.first_name, u.last_name, p.nickname
+        FROM users_userprofile p JOIN users_user u ON u.id = p.user_id
+        """,
+    ]
+
+
+def drop_sql(table):
+    return [
+        f'DROP TRIGGER IF EXISTS {table}_profile_ai',
+        f'DROP TRIGGER IF EXISTS {table}_profile_ad',
+        f'DROP TRIGGER IF EXISTS {table}_profile_au',
+        f'DROP TRIGGER IF EXISTS {table}_user_au',
+        f'DROP TABLE IF EXISTS {table}',
+    ]
+
+
+SCHEMA_SQL = table_sql(WORD_TABLE) + table_sql(TRIGRAM_TABLE)
+DROP_SQL = drop_sql(WORD_TABLE) + drop_sql(TRIGRAM_TABLE)
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        connection = schema_editor.connection
+        # The trigram tokenizer needs SQLite 3.34
+        if connection.vendor != 'sqlite' or connection.Database.sqlite_version_info < (3, 34, 0):
+            return
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_normalize_profile_image_names'),
+    ]
+
+    operations = [
+        migrations.RunPython(run(SCHEMA_SQL), run(DROP_SQL)),
+    ]
@@ -1,8 +1,11 @@
+import copy
+
 from django.db import models
+from django.db.models.fields.files import FieldFile
 from django.contrib.auth.models import AbstractUser
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
-from .utils import user_profile_image_path, validate_image_file_extension
+from .utils import normalize_profile_image_name, user_profile_image_path, validate_image_file_extension
 
 
 class User(AbstractUser):
@@ -60,15 +63,60 @@ class UserProfile(models.Model):
         help_text=_('Designates whether this profile is approved to be shown on the site.'),
     )
     
-    def clean(self):
-        """Ensure one profile per user."""
-        if self.user_id and UserProfile.objects.filter(user=self.user).exclude(pk=self.pk).exists():
-            raise ValidationError('A profile already exists for this user.')
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_stored_values()
+        return instance
+    
+    def _field_state(self, field):
+        value = self.__dict__[field.attname]
+        if isinstance(field, models.FileField):
+            # Rows loaded from the database hold the raw name until the
+            # field is first accessed
+            name = value.name if isinstance(value, FieldFile) else value
+            return name or None
+        return copy.deepcopy(value)
+    
+    def _remember_stored_values(self, fields=None):
+        fields = fields or [field for field in self._meta.concrete_fields if not field.primary_key]
+        stored = self.__dict__.setdefault('_stored_values', {})
+        for field in fields:
+            if field.attname in self.__dict__:
+                stored[field.attname] = self._field_state(field)
+    
+    def get_dirty_fields(self):
+        """Names of the loaded fields that differ from the stored row, or None if unknown."""
+        stored = self.__dict__.get('_stored_values')
+        if stored is None or self._state.adding:
+            return None
+        return [
+            field.name for field in self._meta.concrete_fields
+            if not field.primary_key
+            and field.attname in self.__dict__
+            and (field.attname not in stored or self._field_state(field) != stored[field.attname])
+        ]
     
     def save(self, *args, **kwargs):
-        """Override save to call clean method."""
-        self.clean()
+        """Write only the changed columns of an existing profile, or nothing."""
+        # Keep the stored name normalized so serializers can use it as-is
+        if self.image and self.image._committed:
+            self.image.name = normalize_profile_image_name(self.image.name)
+        
+        if kwargs.get('update_fields') is None:
+            dirty = self.get_dirty_fields()
+            if dirty == []:
+                return
+            if dirty is not None:
+                kwargs['update_fields'] = dirty if 'updated_at' in dirty else dirty + ['updated_at']
+        
         super().save(*args, **kwargs)
+        
+        update_fields = kwargs.get('update_fields')
+        self._remember_stored_values(
+            None if update_fields is None
+            else [self._meta.get_field(name) for name in update_fields]
+        )
     nickname = models.CharField(
         _('nickname'),
         max_length=100,
@@ -1,9 +1,39 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.utils.encoding import filepath_to_uri
 from .models import UserProfile
 
 User = get_user_model()
 
+
+class ProfileImageField(serializers.ImageField):
+    """
+    Image field whose URL is the stored (normalized) name appended to a
+    media base URL. The base is `settings.MEDIA_BASE_URL` when configured,
+    otherwise MEDIA_URL made absolute with the request, and is computed once
+    per serializer context rather than once per row.
+    """
+    CONTEXT_KEY = '_media_base_url'
+    
+    def get_media_base_url(self):
+        context = self.context
+        base_url = context.get(self.CONTEXT_KEY)
+        if base_url is None:
+            base_url = getattr(settings, 'MEDIA_BASE_URL', None)
+            request = context.get('request')
+            if not base_url:
+                base_url = request.build_absolute_uri(settings.MEDIA_URL) if request else settings.MEDIA_URL
+            base_url = base_url.rstrip('/') + '/'
+            context[self.CONTEXT_KEY] = base_url
+        return base_url
+    
+    def to_representation(self, value):
+        if not value:
+            return None
+        return self.get_media_base_url() + filepath_to_uri(value.name)
+
+
 class UserProfileSerializer(serializers.ModelSerializer):
     """Serializer for the UserProfile model."""
     # User fields we want to include in the profile
@@ -17,7 +47,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
     role = serializers.CharField(source='user.role', required=False)
     
     # Profile fields
-    image = serializers.ImageField(required=False, allow_null=True)
+    image = ProfileImageField(required=False, allow_null=True)
     social_links = serializers.JSONField(required=False, default=dict)
     
     class Meta:
@@ -43,43 +73,6 @@ class UserProfileSerializer(serializers.ModelSerializer):
             
         return super().update(instance, validated_data)
     
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
-        
-        # Ensure is_approved is included from the profile model
-        representation['is_approved'] = instance.is_approved
-        
-        if representation.get('image'):
-            # Get the raw image path from the instance
-            image_path = str(instance.image)
-            
-            # If it's already a URL, extract just the filename
-            if 'http' in image_path:
-                # Extract just the filename from the URL
-                image_path = image_path.split('/')[-1]
-            
-            # Remove any leading /media/ or media/ if present
-            image_path = image_path.replace('/media/', '').replace('media/', '')
-            
-            # Remove any duplicate profile_images/ prefixes
-            while image_path.startswith('profile_images/'):
-                image_path = image_path[15:]
-            
-            # Construct the correct relative path
-            image_path = f"profile_images/{image_path}"
-            
-            # Always return just the relative path (frontend will handle the base URL)
-            representation['image'] = f"/media/{image_path}"
-            
-            # If we have a request and need an absolute URL, construct it properly
-            request = self.context.get('request')
-            if request and request.build_absolute_uri().startswith(('http://', 'https://')):
-                # Only use the host from the request, don't include /media/ again
-                base_url = request.build_absolute_uri('/').rstrip('/')
-                representation['image'] = f"{base_url}/media/{image_path}"
-                
-        return representation
-    
     def to_internal_value(self, data):
         # Handle case where image is a URL string
         if 'image' in data and isinstance(data['image'], str):
@@ -93,6 +86,19 @@ class UserProfileSerializer(serializers.ModelSerializer):
             validated_data.pop('image')
         return super().update(instance, validated_data)
 
+class ProfileSearchResultSerializer(serializers.ModelSerializer):
+    """Compact profile entry for directory typeahead results."""
+    username = serializers.CharField(source='user.username', read_only=True)
+    first_name = serializers.CharField(source='user.first_name', read_only=True)
+    last_name = serializers.CharField(source='user.last_name', read_only=True)
+    image = ProfileImageField(read_only=True)
+    
+    class Meta:
+        model = UserProfile
+        fields = ['id', 'username', 'first_name', 'last_name', 'nickname', 'image']
+        read_only_fields = fields
+
+
 class UserSerializer(serializers.ModelSerializer): 
     """Serializer for the User model."""
     # Use string reference to avoid circular import
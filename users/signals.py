@@ -1,6 +1,8 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
+from yearbook.conditional import bump_version
+from yearbook.media_cleanup import file_names, schedule_delete
 from .models import UserProfile
 
 User = get_user_model()
@@ -16,7 +18,29 @@ def create_user_profile(sender, instance, created, **kwargs):
 @receiver(post_save, sender=User)
 def save_user_profile(sender, instance, **kwargs):
     """
-    Signal handler to save the UserProfile whenever the User is saved.
+    Signal handler to save pending changes to an already loaded UserProfile
+    whenever the User is saved. A profile that was never fetched can't have
+    changes, and UserProfile.save skips the write when nothing changed.
     """
-    if hasattr(instance, 'profile'):
-        instance.profile.save()
+    profile = User.profile.related.get_cached_value(instance, default=None)
+    if profile is not None:
+        profile.save()
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def bump_users_version(sender, instance, **kwargs):
+    """
+    Signal handler to expire conditional GET validators of feeds that embed
+    user or profile data.
+    """
+    bump_version('users')
+
+@receiver(post_delete, sender=UserProfile)
+def delete_profile_image(sender, instance, **kwargs):
+    """
+    Signal handler to remove a deleted profile's image in the background
+    once the delete commits.
+    """
+    schedule_delete(*file_names(instance))
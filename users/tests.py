@@ -1,3 +1,125 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from .models import UserProfile
+
+User = get_user_model()
+
+
+class UserProfileSaveTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', first_name='Alice')
+        UserProfile.objects.filter(user=self.user).update(
+            image='profile_images/user_1/photo.jpg',
+            nickname='Al',
+        )
+
+    def profile_updates(self, queries):
+        return [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('UPDATE "users_userprofile"')
+        ]
+
+    def test_save_profile_with_image(self):
+        profile = UserProfile.objects.get(user=self.user)
+        profile.bio = 'Hello'
+        with CaptureQueriesContext(connection) as queries:
+            profile.save()
+
+        updates = self.profile_updates(queries)
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"bio"', updates[0])
+        self.assertNotIn('"image"', updates[0])
+
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual(profile.bio, 'Hello')
+        self.assertEqual(profile.image.name, 'profile_images/user_1/photo.jpg')
+
+    def test_unchanged_profile_is_not_written(self):
+        profile = UserProfile.objects.get(user=self.user)
+        profile.image  # Accessing the field must not mark it changed
+        with self.assertNumQueries(0):
+            profile.save()
+
+    def test_changing_image_is_written(self):
+        profile = UserProfile.objects.get(user=self.user)
+        profile.image = 'profile_images/user_1/other.jpg'
+        profile.save()
+        self.assertEqual(
+            UserProfile.objects.get(user=self.user).image.name,
+            'profile_images/user_1/other.jpg',
+        )
+
+    def test_user_approval_skips_profile_update(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.is_approved = True
+        with CaptureQueriesContext(connection) as queries:
+            user.save()
+        self.assertEqual(self.profile_updates(queries), [])
+
+    def test_user_save_writes_loaded_profile_changes(self):
+        user = User.objects.select_related('profile').get(pk=self.user.pk)
+        user.is_approved = True
+        with CaptureQueriesContext(connection) as queries:
+            user.save()
+        self.assertEqual(self.profile_updates(queries), [])
+
+        user.profile.nickname = 'Ally'
+        user.save()
+        self.assertEqual(UserProfile.objects.get(user=self.user).nickname, 'Ally')
+
+
+class DirectorySearchTests(TestCase):
+    search_url = '/api/auth/profiles/search/'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.john = self.classmate('jsmith', 'John', 'Smith')
+        self.joan = self.classmate('jarc', 'Joan', 'Arc')
+        self.maria = self.classmate('mgold', 'Maria', 'Goldsmith', nickname='Goldie')
+
+    def classmate(self, username, first_name, last_name, nickname='', is_approved=True):
+        user = User.objects.create_user(username, first_name=first_name, last_name=last_name)
+        UserProfile.objects.filter(user=user).update(nickname=nickname, is_approved=is_approved)
+        return UserProfile.objects.get(user=user)
+
+    def search(self, text, **params):
+        response = self.client.get(self.search_url, {'q': text, **params})
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.data]
+
+    def test_prefix_typeahead(self):
+        self.assertCountEqual(self.search('jo'), [self.john.id, self.joan.id])
+        self.assertEqual(self.search('jo sm'), [self.john.id])
+        self.assertEqual(self.search('gold'), [self.maria.id])
+
+    def test_substring_matches_come_after_prefix_matches(self):
+        self.assertEqual(self.search('smith'), [self.john.id, self.maria.id])
+
+    def test_index_follows_renames(self):
+        user = self.john.user
+        user.username, user.last_name = 'jstone', 'Stone'
+        user.save()
+        UserProfile.objects.filter(id=self.joan.id).update(nickname='Smitty')
+
+        self.assertEqual(self.search('smit'), [self.joan.id, self.maria.id])
+        self.assertEqual(self.search('stone'), [self.john.id])
+
+    def test_hidden_profiles_are_not_found(self):
+        hidden = self.classmate('jhid', 'Jo', 'Hidden', is_approved=False)
+
+        self.assertNotIn(hidden.id, self.search('jo'))
+
+    def test_limit_is_clamped(self):
+        self.assertEqual(len(self.search('j', limit=1)), 1)
+        self.assertEqual(len(self.search('j', limit=-5)), 1)
+        self.assertEqual(len(self.search('j', limit='many')), 2)
+
+    def test_list_search_parameter_uses_the_index(self):
+        response = self.client.get('/api/auth/profiles/', {'search': 'jo sm'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['id'] for item in response.data['results']], [self.john.id])
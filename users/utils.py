@@ -1,5 +1,6 @@
 import os
 import uuid
+from urllib.parse import unquote, urlsplit
 from django.core.exceptions import ValidationError
 from django.utils.deconstruct import deconstructible
 from django.utils import timezone
@@ -15,6 +16,28 @@ def user_profile_image_path(instance, filename):
     return os.path.join('profile_images', f'user_{instance.user.id}', filename)
 
 
+def normalize_profile_image_name(name):
+    """
+    Reduce a stored profile image value to its storage name,
+    `profile_images/<path>`. Older clients saved full media URLs, `media/`
+    prefixed paths and repeated `profile_images/` prefixes; only those
+    leading parts are removed, so valid names are left untouched.
+    """
+    if not name:
+        return name
+    if name.startswith(('http://', 'https://')):
+        name = unquote(urlsplit(name).path)
+    for prefix in ('/media/', 'media/'):
+        if name.startswith(prefix):
+            name = name[len(prefix):]
+            break
+    while name.startswith('profile_images/profile_images/'):
+        name = name[len('profile_images/'):]
+    if not name.startswith('profile_images/'):
+        name = f'profile_images/{name.lstrip("/")}'
+    return name
+
+
 def validate_image_file_extension(value):
     """
     Validate that the uploaded file is an image.
@@ -1,12 +1,12 @@
-from rest_framework import status, permissions, generics, filters, serializers, viewsets
+from rest_framework import status, permissions, generics, serializers, viewsets
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.settings import api_settings
+from rest_framework.parsers import FormParser
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
-from rest_framework.decorators import api_view, permission_classes, parser_classes
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.decorators import action, api_view, permission_classes, parser_classes
 from rest_framework import status
 from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
@@ -16,12 +16,17 @@ from django.conf import settings
 from drf_spectacular.utils import extend_schema
 import os
 from .models import UserProfile
+from . import directory
 from django.db import transaction
+from yearbook.parsers import UploadLimitMultiPartParser
+from yearbook.media_cleanup import schedule_delete
+from yearbook.tracing import get_trace
 
 from .serializers import (
     UserSerializer, 
     RegisterSerializer,
-    UserProfileSerializer
+    UserProfileSerializer,
+    ProfileSearchResultSerializer
 )
 
 User = get_user_model()
@@ -62,7 +67,9 @@ class UserDetailView(generics.RetrieveUpdateAPIView):
         return self.update(request, *args, **kwargs)
         
     def update(self, request, *args, **kwargs):
-        print("Request data:", request.data)  # Debug log
+        trace = get_trace(request)
+        if trace.enabled:
+            trace.debug('update.request', data_keys=list(request.data.keys()))
         
         # Get the user instance
         user = self.get_object()
@@ -92,7 +99,7 @@ class UserDetailView(generics.RetrieveUpdateAPIView):
         )
         
         if not user_serializer.is_valid():
-            print("User serializer errors:", user_serializer.errors)
+            trace.info('update.invalid_user', errors=user_serializer.errors)
             return Response(user_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
         # Save user data
@@ -117,7 +124,7 @@ class UserDetailView(generics.RetrieveUpdateAPIView):
             )
             
             if not profile_serializer.is_valid():
-                print("Profile serializer errors:", profile_serializer.errors)
+                trace.info('update.invalid_profile', errors=profile_serializer.errors)
                 return Response(profile_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
             
             profile_serializer.save()
@@ -134,50 +141,28 @@ class UserListView(generics.ListAPIView):
     serializer_class = UserSerializer
     
     def get_queryset(self):
-        # Get all users for debugging
-        all_users = User.objects.all()
-        print("\n=== DEBUGGING USERLISTVIEW ===")
-        print(f"Request path: {self.request.path}")
-        print(f"URL kwargs: {self.kwargs}")
-        print(f"Query params: {self.request.query_params}")
-        
-        # Print all users in database
-        print("\nAll users in database:")
-        for user in all_users:
-            print(f"- {user.username} (ID: {user.id}, is_approved: {user.is_approved})")
-        
-        # Filter unapproved users
-        queryset = User.objects.filter(is_approved=False)
-        print("\nFiltered users (is_approved=False):")
-        for user in queryset:
-            print(f"- {user.username} (ID: {user.id})")
-        
-        # Print serialized data
-        print("\nSerialized data:")
-        serializer = self.get_serializer(queryset, many=True)
-        print(serializer.data)
-        
-        return queryset
+        get_trace(self.request).debug(
+            'get_queryset',
+            url_kwargs=dict(self.kwargs),
+            query_params=self.request.query_params.dict(),
+        )
+        # Unapproved users
+        return User.objects.filter(is_approved=False).select_related('profile')
     
     def list(self, request, *args, **kwargs):
-        # Override list method to add debug info
-        print("\n=== LIST METHOD ===")
+        trace = get_trace(request)
         queryset = self.filter_queryset(self.get_queryset())
         
-        # Print final queryset
-        print("\nFinal queryset count:", queryset.count())
-        for user in queryset:
-            print(f"- {user.username} (ID: {user.id}, is_approved: {user.is_approved})")
-        
         # Serialize the data
-        serializer = self.get_serializer(queryset, many=True)
-        print("\nSerialized data in list method:", serializer.data)
+        with trace.span('list.serialize'):
+            users = self.get_serializer(queryset, many=True).data
+        trace.info('list', count=len(users))
         
         # Return the response with debug info
         response_data = {
             'success': True,
-            'count': queryset.count(),
-            'users': serializer.data,
+            'count': len(users),
+            'users': users,
             'debug': {
                 'path': request.path,
                 'method': request.method,
@@ -186,7 +171,6 @@ class UserListView(generics.ListAPIView):
             }
         }
         
-        print("\nFinal response data:", response_data)
         return Response(response_data)
 
 
@@ -254,25 +238,19 @@ class UserManagementView(APIView):
 @permission_classes([AllowAny])
 def debug_unapproved_users(request):
     """Debug endpoint to test unapproved users query"""
-    print("\n=== DEBUG UNNPROVED USERS ===")
-    
     # Get all users
     all_users = list(User.objects.all().values('id', 'username', 'is_approved'))
-    print("All users:", all_users)
     
     # Get unapproved users
     unapproved = list(User.objects.filter(is_approved=False).values('id', 'username'))
-    print("Unapproved users:", unapproved)
     
     # Get approved users
     approved = list(User.objects.filter(is_approved=True).values('id', 'username'))
-    print("Approved users:", approved)
     
     # Raw SQL query
     with connection.cursor() as cursor:
         cursor.execute("SELECT id, username, is_approved FROM users_user WHERE is_approved = %s", [False])
         raw_results = cursor.fetchall()
-        print("Raw SQL results:", raw_results)
     
     return Response({
         'all_users': all_users,
@@ -324,9 +302,9 @@ class ProfileListView(generics.ListAPIView):
     """View for listing user profiles."""
     permission_classes = [IsAuthenticated]
     serializer_class = UserProfileSerializer
-    queryset = UserProfile.objects.all()
-    filter_backends = [filters.SearchFilter]
-    search_fields = ['user__username', 'user__first_name', 'user__last_name', 'nickname']
+    queryset = UserProfile.objects.select_related('user')
+    # Search first, so an explicit ?ordering= still overrides the ranking
+    filter_backends = [directory.DirectorySearchFilter, *api_settings.DEFAULT_FILTER_BACKENDS]
     
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -357,13 +335,18 @@ class ProfileViewSet(viewsets.ModelViewSet):
     """
     permission_classes = [IsAuthenticated]  # Require authentication for all operations
     serializer_class = UserProfileSerializer
+    # Search first, so an explicit ?ordering= still overrides the ranking
+    filter_backends = [directory.DirectorySearchFilter, *api_settings.DEFAULT_FILTER_BACKENDS]
     http_method_names = ['get', 'post', 'put', 'patch', 'delete']
     
+    TYPEAHEAD_LIMIT = 8
+    TYPEAHEAD_MAX_LIMIT = 20
+    
     def get_permissions(self):
         """
         Instantiates and returns the list of permissions that this view requires.
         """
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'search']:
             permission_classes = [permissions.AllowAny]  # Anyone can view approved profiles
         else:
             permission_classes = [IsAuthenticated]  # Need to be authenticated for other actions
@@ -377,7 +360,7 @@ class ProfileViewSet(viewsets.ModelViewSet):
         - Unauthenticated users can only see approved profiles
         """
         user = self.request.user
-        queryset = UserProfile.objects.all()
+        queryset = UserProfile.objects.select_related('user')
         
         # For unauthenticated users, only show approved profiles
         if not user.is_authenticated:
@@ -390,17 +373,33 @@ class ProfileViewSet(viewsets.ModelViewSet):
         # For regular authenticated users, show approved profiles and their own profile
         queryset = queryset.filter(Q(is_approved=True) | Q(user=user))
         
-        # Apply search if provided
-        search = self.request.query_params.get('search', None)
-        if search:
-            queryset = queryset.filter(
-                Q(user__username__icontains=search) |
-                Q(user__first_name__icontains=search) |
-                Q(user__last_name__icontains=search) |
-                Q(nickname__icontains=search)
-            )
-        
+        # `?search=` is answered from the directory index by DirectorySearchFilter
         return queryset.order_by('-created_at')
+    
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Typeahead for the classmates page: the best `limit` visible profiles
+        matching `?q=`, as compact results.
+        
+        Ranking is approximate for very common prefixes: only the first
+        `directory.CANDIDATES` index matches (in profile id order) are
+        scored, so with more matches than that the best ones may be missed
+        until the query gets more specific.
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response([])
+        try:
+            limit = int(request.query_params.get('limit', self.TYPEAHEAD_LIMIT))
+        except ValueError:
+            limit = self.TYPEAHEAD_LIMIT
+        limit = max(1, min(limit, self.TYPEAHEAD_MAX_LIMIT))
+        
+        # Over-fetch a little so hidden profiles don't leave the list short
+        profiles = directory.search(self.get_queryset(), query, limit=limit * 2)[:limit]
+        serializer = ProfileSearchResultSerializer(profiles, many=True, context=self.get_serializer_context())
+        return Response(serializer.data)
 
     def create(self, request, *args, **kwargs):
         # Check if user already has a profile
@@ -519,11 +518,7 @@ class RejectProfileView(APIView):
             with transaction.atomic():
                 profile = get_object_or_404(UserProfile, id=profile_id)
                 
-                # Delete the profile image if it exists
-                if profile.image:
-                    profile.image.delete(save=False)
-                
-                # Delete the profile
+                # Delete the profile; its image is removed in the background
                 profile.delete()
                 
                 return Response(
@@ -540,7 +535,7 @@ class RejectProfileView(APIView):
 class ProfileImageView(APIView):
     """View for handling profile image uploads."""
     permission_classes = [IsAuthenticated]
-    parser_classes = [MultiPartParser, FormParser]
+    parser_classes = [UploadLimitMultiPartParser, FormParser]
     
     def _get_absolute_media_url(self, request, path):
         """Generate absolute media URL."""
@@ -559,46 +554,43 @@ class ProfileImageView(APIView):
         # return f"{base_url}/media/{path}"
 
     def post(self, request, format=None):
+        trace = get_trace(request)
         if 'image' not in request.FILES:
-            print("Error: No image file provided in request.FILES")
+            trace.info('upload.missing_image')
             return Response(
                 {'error': 'No image file provided'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
 
         try:
-            print(f"Processing image upload for user: {request.user.username}")
-            print(f"Uploaded file: {request.FILES['image'].name} (size: {request.FILES['image'].size} bytes)")
+            trace.debug('upload.received', user_id=request.user.id, name=request.FILES['image'].name, size=request.FILES['image'].size)
             
             # Get or create user profile
             try:
                 profile, created = UserProfile.objects.get_or_create(user=request.user)
-                print(f"Profile {'created' if created else 'retrieved'}: {profile.id}")
+                trace.debug('upload.profile', profile_id=profile.id, created=created)
             except Exception as e:
                 error_msg = f"Error getting/creating profile: {str(e)}"
-                print(error_msg)
+                trace.info('upload.error', error=error_msg)
                 return Response(
                     {'error': error_msg},
                     status=status.HTTP_500_INTERNAL_SERVER_ERROR
                 )
 
-            # If user already has a profile image, delete the old one
-            if profile.image:
-                print(f"Deleting old image: {profile.image.path}")
-                try:
-                    profile.image.delete(save=False)
-                except Exception as e:
-                    print(f"Warning: Could not delete old image: {str(e)}")
+            # If user already has a profile image, delete the old one once the new one is saved
+            old_image = profile.image.name if profile.image else None
 
             # Save the new image
             try:
                 profile.image = request.FILES['image']
                 profile.save()
-                print(f"New image saved to: {profile.image.path}")
+                if old_image and old_image != profile.image.name:
+                    trace.debug('upload.delete_old', name=old_image)
+                    schedule_delete(old_image)
                 
                 # Get the relative URL
                 image_url = profile.image.url
-                print(f"Generated image URL: {image_url}")
+                trace.debug('upload.saved', name=profile.image.name, url=image_url)
 
                 # Return the full relative URL
                 # The URL is already in the format /media/profile_images/user_<id>/filename
@@ -613,7 +605,7 @@ class ProfileImageView(APIView):
                 
             except Exception as e:
                 error_msg = f"Error saving image: {str(e)}"
-                print(error_msg)
+                trace.info('upload.error', error=error_msg)
                 return Response(
                     {'error': error_msg},
                     status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -621,7 +613,7 @@ class ProfileImageView(APIView):
 
         except Exception as e:
             error_msg = f"Unexpected error: {str(e)}"
-            print(error_msg)
+            trace.info('upload.error', error=error_msg)
             return Response(
                 {'error': 'Failed to process image upload', 'details': error_msg}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -0,0 +1,109 @@
+"""
+Conditional GET support for list endpoints.
+
+Each scope (e.g. 'memories', 'events', 'users') has a version token in the
+cache that is replaced whenever something in that scope changes. A feed's
+ETag hashes the tokens of the scopes it depends on together with the
+caller's identity and the full request path, so a poll that sees no change
+is answered with 304 before any query runs. Deployments with several
+worker processes need a shared cache backend for the tokens to agree.
+
+High-churn scopes such as like counts use `mark_changed` instead of
+`bump_version`: the change is only noted, and the token is replaced by the
+first read at least `interval` seconds after the previous replacement. A
+feed depending on such a scope changes its ETag at most once per interval,
+at the cost of serving counts up to `interval` seconds old to clients that
+get a 304.
+"""
+import hashlib
+import time
+import uuid
+from functools import wraps
+
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+VERSION_TIMEOUT = None  # Tokens only change when a scope changes
+COALESCE_INTERVAL = 60  # seconds, for scopes changed through mark_changed
+
+
+def _key(scope):
+    return f'feed_version:{scope}'
+
+
+def _pending_key(scope):
+    return f'feed_version_pending:{scope}'
+
+
+def bump_version(*scopes):
+    """Mark every scope as changed."""
+    now = int(time.time())
+    cache.set_many(
+        {_key(scope): (uuid.uuid4().hex, now) for scope in scopes},
+        VERSION_TIMEOUT,
+    )
+
+
+def mark_changed(scope, interval=COALESCE_INTERVAL):
+    """Note a change to a high-churn scope; its token is replaced at most once per `interval`."""
+    cache.set(_pending_key(scope), interval, VERSION_TIMEOUT)
+
+
+def get_versions(scopes):
+    """Return the (token, changed_at) version of each scope, creating missing ones."""
+    keys = [_key(scope) for scope in scopes]
+    pending_keys = [_pending_key(scope) for scope in scopes]
+    found = cache.get_many(keys + pending_keys)
+    now = int(time.time())
+
+    changed = {}
+    for key, pending_key in zip(keys, pending_keys):
+        interval = found.get(pending_key)
+        if key not in found:
+            changed[key] = (uuid.uuid4().hex, now)
+        elif interval is not None and now - found[key][1] >= interval:
+            changed[key] = (uuid.uuid4().hex, now)
+        else:
+            continue
+        if interval is not None:
+            cache.delete(pending_key)
+    if changed:
+        cache.set_many(changed, VERSION_TIMEOUT)
+        found.update(changed)
+    return [found[key] for key in keys]
+
+
+def feed_validators(request, scopes):
+    versions = get_versions(scopes)
+    user = request.user
+    renderer = getattr(request, 'accepted_renderer', None)
+    parts = [token for token, _ in versions] + [
+        str(user.pk if user.is_authenticated else 0),
+        request.get_full_path(),
+        getattr(renderer, 'format', ''),
+    ]
+    etag = '"%s"' % hashlib.sha1('|'.join(parts).encode()).hexdigest()
+    last_modified = max(changed_at for _, changed_at in versions)
+    return etag, last_modified
+
+
+def conditional_list(*scopes):
+    """
+    Decorator for a view's `list` method that answers `304 Not Modified`
+    when none of `scopes` changed since the client's copy.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            etag, last_modified = feed_validators(request, scopes)
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = method(self, request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response.headers['ETag'] = etag
+                response.headers['Last-Modified'] = http_date(last_modified)
+            patch_vary_headers(response, ['Authorization'])
+            return response
+        return wrapper
+    return decorator
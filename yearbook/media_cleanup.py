@@ -0,0 +1,110 @@
+"""
+Deferred deletion of stored media files.
+
+Deleting a row that owns files only schedules the files for removal: the
+names are queued once the surrounding transaction commits (a rollback
+keeps them) and a daemon thread unlinks them, together with their image
+renditions, outside the request. With `MEDIA_DELETION['ASYNC']` off the
+files are deleted right after the commit instead, which is what tests and
+one-off scripts usually want.
+
+The queue lives in each worker process and is drained at exit; anything
+lost to a crash is picked up by `collect_orphaned_media`.
+"""
+import atexit
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import models, transaction
+
+from . import renditions
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ASYNC': True,
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'MEDIA_DELETION', {})}
+
+
+def delete_file(name):
+    """Remove a stored file and its renditions now."""
+    default_storage.delete(name)
+    renditions.delete_all(name)
+
+
+class DeletionQueue:
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def put(self, names):
+        for name in names:
+            self._queue.put(name)
+        self._ensure_started()
+
+    def drain(self):
+        """Delete everything still queued in the calling thread."""
+        while True:
+            try:
+                name = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            self._delete(name)
+
+    def _delete(self, name):
+        try:
+            delete_file(name)
+        except Exception:
+            logger.exception('Deleting media file %s failed', name)
+        finally:
+            self._queue.task_done()
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='media-deleter', daemon=True)
+            self._thread.start()
+            atexit.register(self.drain)
+
+    def _run(self):
+        while True:
+            self._delete(self._queue.get())
+
+
+deletion_queue = DeletionQueue()
+
+
+def schedule_delete(*names):
+    """Delete the given storage names once the current transaction commits."""
+    names = [name for name in names if name]
+    if not names:
+        return
+
+    def run():
+        if get_config()['ASYNC']:
+            deletion_queue.put(names)
+        else:
+            for name in names:
+                delete_file(name)
+
+    transaction.on_commit(run)
+
+
+def file_names(instance):
+    """Storage names of every file field set on a model instance."""
+    return [
+        getattr(instance, field.attname).name
+        for field in instance._meta.concrete_fields
+        if isinstance(field, models.FileField) and getattr(instance, field.attname)
+    ]
@@ -0,0 +1,69 @@
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.parsers import MultiPartParser
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'File size too large.'
+    default_code = 'upload_too_large'
+
+
+class MaxUploadSizeHandler(FileUploadHandler):
+    """
+    Upload handler that counts bytes as they stream in and stops the upload
+    as soon as any single file exceeds `max_size`, before the rest of the
+    file is buffered in memory or written to a temporary file.
+    """
+
+    def __init__(self, max_size, request=None):
+        super().__init__(request)
+        self.max_size = max_size
+        self.exceeded = False
+        self.received = 0
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        self.received = 0
+        if content_length is not None and content_length > self.max_size:
+            self._abort(field_name)
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            self._abort(self.field_name)
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+    def _abort(self, field_name):
+        self.exceeded = field_name or True
+        # Don't drain the rest of the request body either
+        raise StopUpload(connection_reset=True)
+
+
+class UploadLimitMultiPartParser(MultiPartParser):
+    """
+    Multipart parser that rejects oversized files while they stream.
+
+    The limit is the view's `max_upload_size` attribute when it has one,
+    otherwise `settings.MAX_UPLOAD_SIZE`.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        request = parser_context['request']
+        max_size = getattr(parser_context.get('view'), 'max_upload_size', None) or settings.MAX_UPLOAD_SIZE
+
+        handler = MaxUploadSizeHandler(max_size, request)
+        request.upload_handlers.insert(0, handler)
+        result = super().parse(stream, media_type, parser_context)
+
+        if handler.exceeded:
+            raise UploadTooLarge(
+                f'File size too large. Maximum size is {max_size // (1024 * 1024)}MB.'
+            )
+        return result
@@ -0,0 +1,18 @@
+from rest_framework.renderers import JSONRenderer
+
+
+class PassthroughRenderer(JSONRenderer):
+    """
+    Renderer for actions that build their own HttpResponse, such as file
+    downloads. It accepts any media type, so a client sending
+    `Accept: application/zip` isn't refused with 406 before the view runs.
+    Error responses still render as JSON.
+    """
+    media_type = '*/*'
+    format = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = 'application/json'
+        return super().render(data, 'application/json', renderer_context)
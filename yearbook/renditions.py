@@ -0,0 +1,128 @@
+"""
+Resized variants of uploaded images.
+
+Each rendition has a name, a bounding box and an output format. Renditions
+are stored under `renditions/<name>/<source path>.<ext>`, where the source
+path keeps its own extension, so every source image maps to its own
+rendition path. Serializers always link to `RenditionView`, which
+generates the rendition on the first request and redirects to the stored
+file; `generate_renditions` precomputes them in bulk.
+
+Rendition links are signed. Only images the API has already shown to
+someone can be rendered, and serializing a list needs no storage calls.
+"""
+import io
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare
+from PIL import Image, ImageOps
+
+DEFAULT_RENDITIONS = {
+    'thumb': {'size': (320, 320), 'format': 'JPEG', 'quality': 80},
+    'medium': {'size': (1280, 1280), 'format': 'JPEG', 'quality': 85},
+    'webp': {'size': (1280, 1280), 'format': 'WEBP', 'quality': 80},
+}
+
+# Only uploads under these prefixes can be rendered
+DEFAULT_SOURCE_PREFIXES = ('events/', 'memories/')
+
+EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp', 'PNG': 'png'}
+ROOT = 'renditions'
+SIGNATURE_PARAM = 'sig'
+
+_signer = signing.Signer(salt='yearbook.renditions')
+
+
+class RenditionError(Exception):
+    pass
+
+
+def get_renditions():
+    return getattr(settings, 'IMAGE_RENDITIONS', DEFAULT_RENDITIONS)
+
+
+def get_source_prefixes():
+    return tuple(getattr(settings, 'IMAGE_RENDITION_SOURCES', DEFAULT_SOURCE_PREFIXES))
+
+
+def rendition_path(source_name, name):
+    spec = get_renditions()[name]
+    return f'{ROOT}/{name}/{source_name}.{EXTENSIONS[spec["format"]]}'
+
+
+def is_valid_source(source_name):
+    parts = source_name.split('/')
+    return (
+        source_name.startswith(get_source_prefixes())
+        and '..' not in parts
+        and '' not in parts
+    )
+
+
+def render(source, spec):
+    """Return the encoded bytes of `source` resized to fit `spec`."""
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        if spec['format'] == 'JPEG' and image.mode != 'RGB':
+            image = image.convert('RGB')
+        elif image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA')
+        image.thumbnail(spec['size'], Image.Resampling.LANCZOS)
+        output = io.BytesIO()
+        image.save(output, spec['format'], quality=spec['quality'], optimize=True)
+    return output.getvalue()
+
+
+def generate(source_name, name, overwrite=False):
+    """Store the `name` rendition of `source_name` if missing and return its path."""
+    path = rendition_path(source_name, name)
+    if not overwrite and default_storage.exists(path):
+        return path
+
+    try:
+        with default_storage.open(source_name, 'rb') as source:
+            content = render(source, get_renditions()[name])
+    except (OSError, ValueError, Image.DecompressionBombError) as exc:
+        raise RenditionError(f'Cannot render {source_name}: {exc}') from exc
+
+    if overwrite:
+        default_storage.delete(path)
+    saved = default_storage.save(path, ContentFile(content))
+    if saved != path:
+        # Another request rendered it first
+        default_storage.delete(saved)
+    return path
+
+
+def delete_all(source_name):
+    """Remove every stored rendition of `source_name`."""
+    for name in get_renditions():
+        default_storage.delete(rendition_path(source_name, name))
+
+
+def signature(source_name, name):
+    return _signer.signature(f'{name}/{source_name}')
+
+
+def is_valid_signature(source_name, name, value):
+    return bool(value) and constant_time_compare(value, signature(source_name, name))
+
+
+def rendition_url(source_name, name):
+    """Signed URL of the view that serves a rendition, generating it when missing."""
+    url = reverse('image-rendition', kwargs={'name': name, 'source': source_name})
+    return f'{url}?{SIGNATURE_PARAM}={signature(source_name, name)}'
+
+
+def rendition_urls(field_file, request=None):
+    """Map each rendition name to an absolute URL for `field_file`, or None without a file."""
+    if not field_file:
+        return None
+    urls = {name: rendition_url(field_file.name, name) for name in get_renditions()}
+    if request is not None:
+        urls = {name: request.build_absolute_uri(url) for name, url in urls.items()}
+    return urls
@@ -0,0 +1,15 @@
+from rest_framework import serializers
+
+
+class BulkModerationSerializer(serializers.Serializer):
+    """Validates a bulk approve/reject request for a list of object IDs."""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=1000,
+    )
+    action = serializers.ChoiceField(choices=['approve', 'reject'])
+
+    def validate_ids(self, value):
+        # Keep the caller's order but drop repeats
+        return list(dict.fromkeys(value))
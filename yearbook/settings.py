@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 from datetime import timedelta
 import os
+import tempfile
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -53,6 +54,7 @@ INSTALLED_APPS = [
     'classmates.apps.ClassmatesConfig',
     'events.apps.EventsConfig',  # Events app
     'gcprojects.apps.GcprojectsConfig',  # GC Projects app
+    'memories.apps.MemoriesConfig',  # Memories app
     # 'gcpr'
     
 
@@ -67,6 +69,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'yearbook.tracing.RequestTraceMiddleware',
 ]
 
 ROOT_URLCONF = 'yearbook.urls'
@@ -99,6 +102,20 @@ DATABASES = {
     }
 }
 
+# Cache
+# Leaderboards, slug lookups, the events timeline and conditional GET
+# versions are updated in place and invalidated on writes, so every worker
+# process must see the same cache. The default file-based cache is shared by
+# all workers on one host; point CACHE_BACKEND/CACHE_LOCATION at Redis or
+# Memcached when running on several hosts. A per-process LocMemCache would
+# leave the other workers serving stale data until entries expire.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', os.path.join(tempfile.gettempdir(), 'yearbook-cache')),
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -141,10 +158,34 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+STORAGES = {
+    # Stores identical uploads once (hard links into MEDIA_ROOT/.blobs)
+    'default': {'BACKEND': 'yearbook.storage.DeduplicatingFileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+# Tell uploaders when a photo is already in the event (one extra query per upload)
+WARN_DUPLICATE_UPLOADS = os.environ.get('WARN_DUPLICATE_UPLOADS') == '1'
+
+MEDIA_DELETION = {
+    'ASYNC': True,  # unlink files of deleted rows on a background thread
+}
+
 # File upload settings
+# Hash uploads while they stream in, so storage dedup doesn't read them again
+FILE_UPLOAD_HANDLERS = [
+    'yearbook.uploadhandlers.HashingMemoryFileUploadHandler',
+    'yearbook.uploadhandlers.HashingTemporaryFileUploadHandler',
+]
 FILE_UPLOAD_PERMISSIONS = 0o644
 FILE_UPLOAD_DIRECTORY_PERMISSIONS = 0o755
 MAX_UPLOAD_SIZE = 10 * 1024 * 1024  # 10MB
+# Album uploads send hundreds of files in one request
+DATA_UPLOAD_MAX_NUMBER_FILES = 500
+
+BULK_PHOTO_UPLOAD = {
+    'MAX_FILES': DATA_UPLOAD_MAX_NUMBER_FILES,
+    'WORKERS': 4,  # threads validating and storing files, shared by all requests
+}
 
 # Custom user model
 AUTH_USER_MODEL = 'users.User'
@@ -166,7 +207,7 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 10,
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
-        'rest_framework.parsers.MultiPartParser',
+        'yearbook.parsers.UploadLimitMultiPartParser',  # Enforces MAX_UPLOAD_SIZE while streaming
         'rest_framework.parsers.FormParser',
     ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
@@ -206,6 +247,28 @@ SIMPLE_JWT = {
     'JTI_CLAIM': 'jti',
 }
 
+# Request tracing (see yearbook/tracing.py)
+# Disabled by default. When enabled, SAMPLE_RATE of requests are recorded and
+# can be read by staff at /api/debug/traces/. Sending the X-Trace header
+# forces a trace only from a staff session or when its value equals
+# FORCE_SECRET; with no secret set, other clients can't force tracing.
+REQUEST_TRACING = {
+    'ENABLED': os.environ.get('REQUEST_TRACING') == '1',
+    'SAMPLE_RATE': float(os.environ.get('REQUEST_TRACING_SAMPLE_RATE', '0.01')),
+    'FORCE_SECRET': os.environ.get('REQUEST_TRACING_FORCE_SECRET', ''),
+    'LEVEL': 'info',  # 'debug' also records per-stage details
+    'BUFFER_SIZE': 200,
+}
+
+# Write-behind buffering of memory likes (see memories/like_buffer.py)
+# When enabled, like toggles are coalesced in memory and written in batches
+# every FLUSH_INTERVAL seconds instead of one transaction per click.
+LIKE_WRITE_BEHIND = {
+    'ENABLED': os.environ.get('LIKE_WRITE_BEHIND') == '1',
+    'FLUSH_INTERVAL': 1.0,  # seconds
+    'MAX_BATCH': 500,  # flush early once this many toggles are pending
+}
+
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True  # For development only, restrict in production
 CORS_ALLOW_CREDENTIALS = True
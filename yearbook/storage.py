@@ -0,0 +1,151 @@
+"""
+Content-addressed deduplication for uploaded media.
+
+Every file saved through `DeduplicatingFileSystemStorage` is hashed and its
+bytes are kept once under `MEDIA_ROOT/.blobs/<aa>/<sha256>`. The name a
+model stores (e.g. `events/event_3/event_3_photo.jpg`) is a hard link to
+that blob, so URLs and upload paths are unchanged while a re-upload of the
+same bytes costs no extra disk space. The filesystem's link count is the
+reference count: deleting one name leaves the bytes in place for the
+others, and the blob itself is removed with its last name. The digest is
+also kept in an extended attribute of the shared inode, so deleting a name
+doesn't read the file again to find its blob.
+
+Blobs must live on the same filesystem as MEDIA_ROOT. Where hard links are
+not supported the storage quietly behaves like `FileSystemStorage`.
+"""
+import hashlib
+import os
+
+from django.core.files.storage import FileSystemStorage
+
+BLOB_DIR = '.blobs'
+HASH_ATTR = 'content_hash'
+DIGEST_XATTR = 'user.yearbook.sha256'
+
+
+def content_hash(content):
+    """
+    Return the SHA-256 hex digest of a file, reading it in chunks. The
+    digest is cached on the file object so callers and the storage share it.
+    """
+    digest = getattr(content, HASH_ATTR, None)
+    if digest:
+        return digest
+    hasher = hashlib.sha256()
+    for chunk in content.chunks():
+        hasher.update(chunk)
+    content.seek(0)
+    digest = hasher.hexdigest()
+    try:
+        setattr(content, HASH_ATTR, digest)
+    except AttributeError:
+        pass
+    return digest
+
+
+def file_hash(path):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def tag_digest(path, digest):
+    try:
+        os.setxattr(path, DIGEST_XATTR, digest.encode())
+    except (AttributeError, OSError):
+        pass  # No extended attributes on this platform or filesystem
+
+
+def tagged_digest(path):
+    try:
+        return os.getxattr(path, DIGEST_XATTR).decode()
+    except (AttributeError, OSError):
+        return None
+
+
+class DeduplicatingFileSystemStorage(FileSystemStorage):
+
+    def blob_path(self, digest):
+        return os.path.join(self.location, BLOB_DIR, digest[:2], digest)
+
+    def _save(self, name, content):
+        digest = content_hash(content)
+        blob = self.blob_path(digest)
+
+        if os.path.exists(blob):
+            linked = self._link_existing(blob, name)
+            if linked is not None:
+                return linked
+
+        name = super()._save(name, content)
+        self.adopt(name, digest)
+        return name
+
+    def _link_existing(self, blob, name):
+        """Point a new name at an existing blob; None if links aren't possible here."""
+        while True:
+            full_path = self.path(name)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            try:
+                os.link(blob, full_path)
+            except FileExistsError:
+                name = self.get_available_name(name)
+            except OSError:
+                return None
+            else:
+                return str(name).replace('\\', '/')
+
+    def adopt(self, name, digest=None):
+        """
+        Make the stored file `name` share bytes with its blob: link it in as
+        the blob if none exists yet, otherwise replace it by a link to the
+        blob. Returns the number of bytes reclaimed.
+        """
+        full_path = self.path(name)
+        digest = digest or file_hash(full_path)
+        blob = self.blob_path(digest)
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        try:
+            os.link(full_path, blob)
+            tag_digest(blob, digest)
+            return 0
+        except FileExistsError:
+            pass
+        except OSError:
+            return 0
+
+        # Tags blobs stored before digests were kept on the inode
+        tag_digest(blob, digest)
+        stat, blob_stat = os.stat(full_path), os.stat(blob)
+        if (stat.st_dev, stat.st_ino) == (blob_stat.st_dev, blob_stat.st_ino):
+            return 0
+        temp_path = f'{full_path}.dedup'
+        try:
+            os.link(blob, temp_path)
+            os.replace(temp_path, full_path)
+        except OSError:
+            return 0
+        return stat.st_size
+
+    def delete(self, name):
+        if not name:
+            raise ValueError('The name must be given to delete().')
+        full_path = self.path(name)
+        try:
+            links = os.stat(full_path).st_nlink
+        except FileNotFoundError:
+            return
+        # The blob plus this name: drop the blob as well. Untagged files (no
+        # xattr support, or never adopted by deduplicate_media) are hashed
+        digest = (tagged_digest(full_path) or file_hash(full_path)) if links == 2 else None
+        super().delete(name)
+        if digest:
+            blob = self.blob_path(digest)
+            try:
+                if os.stat(blob).st_nlink == 1:
+                    os.remove(blob)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,177 @@
+"""
+Sampled, in-process request tracing.
+
+Views record structured events and timed spans on the trace returned by
+`get_trace(request)`. Tracing is off unless `REQUEST_TRACING['ENABLED']` is
+set; then `RequestTraceMiddleware` samples `SAMPLE_RATE` of requests and
+pushes each finished trace into a bounded ring buffer that staff can read
+from `/api/debug/traces/`. A request can force tracing with an `X-Trace`
+header only if it comes from a staff session or the header carries
+`FORCE_SECRET`, so anonymous clients can't make every request pay for it.
+
+Unsampled requests get `NULL_TRACE`, whose methods do nothing, so views
+should guard any expensive field computation with `if trace.enabled:`.
+"""
+import hmac
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+from django.conf import settings
+from django.utils import timezone
+
+LEVELS = {
+    'debug': 10,
+    'info': 20,
+}
+
+DEFAULTS = {
+    'ENABLED': False,
+    'SAMPLE_RATE': 0.0,
+    'LEVEL': 'info',
+    'BUFFER_SIZE': 200,
+    'FORCE_HEADER': 'X-Trace',
+    'FORCE_SECRET': '',  # Without a secret only staff sessions can force a trace
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'REQUEST_TRACING', {})}
+
+
+class NullTrace:
+    """Trace used for unsampled requests; records nothing."""
+    enabled = False
+    _span = nullcontext()
+
+    def debug(self, stage, **fields):
+        pass
+
+    def info(self, stage, **fields):
+        pass
+
+    def span(self, stage, **fields):
+        return self._span
+
+
+NULL_TRACE = NullTrace()
+
+
+class Trace:
+    """Events and spans recorded for a single sampled request."""
+    enabled = True
+
+    def __init__(self, request, level='info'):
+        self.id = uuid.uuid4().hex
+        self.method = request.method
+        self.path = request.path
+        self.started_at = timezone.now()
+        self.level = LEVELS[level]
+        self.events = []
+        self._start = time.perf_counter()
+
+    def _record(self, level, stage, fields, duration=None):
+        if LEVELS[level] < self.level:
+            return
+        event = {
+            'stage': stage,
+            'level': level,
+            'offset_ms': round((time.perf_counter() - self._start) * 1000, 3),
+        }
+        if duration is not None:
+            event['duration_ms'] = round(duration * 1000, 3)
+        if fields:
+            event['fields'] = fields
+        self.events.append(event)
+
+    def debug(self, stage, **fields):
+        self._record('debug', stage, fields)
+
+    def info(self, stage, **fields):
+        self._record('info', stage, fields)
+
+    @contextmanager
+    def span(self, stage, **fields):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record('info', stage, fields, duration=time.perf_counter() - start)
+
+    def as_dict(self, status_code=None):
+        return {
+            'id': self.id,
+            'method': self.method,
+            'path': self.path,
+            'started_at': self.started_at.isoformat(),
+            'duration_ms': round((time.perf_counter() - self._start) * 1000, 3),
+            'status': status_code,
+            'events': self.events,
+        }
+
+
+class TraceBuffer:
+    """Thread-safe ring buffer holding the most recent finished traces."""
+
+    def __init__(self, size):
+        self._traces = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def append(self, trace):
+        with self._lock:
+            self._traces.append(trace)
+
+    def snapshot(self):
+        with self._lock:
+            return list(reversed(self._traces))
+
+    def clear(self):
+        with self._lock:
+            self._traces.clear()
+
+
+buffer = TraceBuffer(get_config()['BUFFER_SIZE'])
+
+
+def get_trace(request):
+    """Return the trace attached to a Django or DRF request, or NULL_TRACE."""
+    return getattr(request, 'trace', NULL_TRACE) if request is not None else NULL_TRACE
+
+
+class RequestTraceMiddleware:
+    """Decides per request whether to trace it, and files the finished trace."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        config = get_config()
+        self.enabled = config['ENABLED']
+        self.sample_rate = config['SAMPLE_RATE']
+        self.level = config['LEVEL']
+        self.force_header = config['FORCE_HEADER']
+        self.force_secret = config['FORCE_SECRET']
+
+    def __call__(self, request):
+        if not self.enabled or not self._sampled(request):
+            request.trace = NULL_TRACE
+            return self.get_response(request)
+
+        trace = request.trace = Trace(request, level=self.level)
+        response = self.get_response(request)
+        buffer.append(trace.as_dict(status_code=response.status_code))
+        return response
+
+    def _sampled(self, request):
+        forced = request.headers.get(self.force_header) if self.force_header else None
+        if forced is not None and self._may_force(request, forced):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _may_force(self, request, value):
+        if self.force_secret and hmac.compare_digest(value.encode(), self.force_secret.encode()):
+            return True
+        # Session auth only: JWT users aren't authenticated until the view runs
+        user = getattr(request, 'user', None)
+        return bool(user is not None and user.is_authenticated and user.is_staff)
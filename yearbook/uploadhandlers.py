@@ -0,0 +1,38 @@
+import hashlib
+
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+
+from .storage import HASH_ATTR
+
+
+class ContentHashMixin:
+    """
+    Hash each file while it streams in and attach the SHA-256 digest to the
+    uploaded file, where `yearbook.storage.content_hash` picks it up instead
+    of reading the file again.
+    """
+
+    def new_file(self, *args, **kwargs):
+        self.hasher = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        data = super().receive_data_chunk(raw_data, start)
+        if data is None:
+            # This handler kept the chunk, so it will also build the file
+            self.hasher.update(raw_data)
+        return data
+
+    def file_complete(self, file_size):
+        uploaded = super().file_complete(file_size)
+        if uploaded is not None:
+            setattr(uploaded, HASH_ATTR, self.hasher.hexdigest())
+        return uploaded
+
+
+class HashingMemoryFileUploadHandler(ContentHashMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(ContentHashMixin, TemporaryFileUploadHandler):
+    pass
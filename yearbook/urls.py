@@ -13,6 +13,7 @@ from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 from rest_framework import permissions
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
+from .views import RenditionView, TraceListView
 
 schema_view = get_schema_view(
     openapi.Info(
@@ -38,6 +39,9 @@ urlpatterns = [
     path('api/', include([
         path('events/', include('events.urls')),  # Events app endpoints
         path('projects/', include('gcprojects.urls')),  # GC Projects endpoints
+        path('memories/', include('memories.urls')),  # Memories endpoints
+        path('debug/traces/', TraceListView.as_view(), name='debug-traces'),  # Sampled request traces (staff only)
+        path('renditions/<str:name>/<path:source>', RenditionView.as_view(), name='image-rendition'),  # Resized images
     ])),
 ]
 
@@ -0,0 +1,58 @@
+from django.core.files.storage import default_storage
+from django.http import Http404, HttpResponseRedirect
+from django.utils.cache import patch_cache_control
+from rest_framework import status
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from drf_spectacular.utils import extend_schema
+
+from . import renditions, tracing
+
+
+@extend_schema(tags=['Admin - Debug'])
+class TraceListView(APIView):
+    """
+    API endpoint for staff to inspect recently sampled request traces
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            'enabled': tracing.get_config()['ENABLED'],
+            'traces': tracing.buffer.snapshot(),
+        })
+
+    def delete(self, request):
+        tracing.buffer.clear()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+@extend_schema(tags=['Media'], responses={302: None})
+class RenditionView(APIView):
+    """
+    Redirects to a resized rendition of an uploaded image, generating it
+    on the first request. Only signed links from `rendition_url` are served
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    # Lets browsers skip this view once they know where a rendition is stored
+    redirect_max_age = 60 * 60 * 24
+
+    def get(self, request, name, source):
+        if name not in renditions.get_renditions() or not renditions.is_valid_source(source):
+            raise Http404
+        if not renditions.is_valid_signature(source, name, request.query_params.get(renditions.SIGNATURE_PARAM)):
+            raise Http404
+        if not default_storage.exists(source):
+            raise Http404
+
+        try:
+            path = renditions.generate(source, name)
+        except renditions.RenditionError:
+            # Fall back to the original rather than a broken image
+            tracing.get_trace(request).info('rendition failed', source=source, rendition=name)
+            return HttpResponseRedirect(request.build_absolute_uri(default_storage.url(source)))
+        response = HttpResponseRedirect(request.build_absolute_uri(default_storage.url(path)))
+        patch_cache_control(response, public=True, max_age=self.redirect_max_age)
+        return response
@@ -0,0 +1,218 @@
+"""
+Streaming ZIP archives of stored files.
+
+Entries are stored without compression and written with data descriptors,
+so each file is read once in fixed-size chunks and memory use doesn't grow
+with the archive. Because stored entries have a known size, the archive's
+exact length and layout are known before any byte is sent. That lets
+`ZipStream` serve `Range` requests: a resumed download skips the bytes
+the client already has, and only needs the CRC-32 of skipped files for the
+central directory. Those CRCs are cached, so resuming usually reads nothing
+twice.
+"""
+import hashlib
+import struct
+import zlib
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+
+CHUNK_SIZE = 64 * 1024
+CRC_CACHE_TIMEOUT = 24 * 60 * 60
+
+ZIP64_LIMIT = 0xFFFFFFFF
+FLAG_DATA_DESCRIPTOR = 0x08
+FLAG_UTF8 = 0x800
+VERSION_DEFAULT = 20
+VERSION_ZIP64 = 45
+
+
+def dos_datetime(dt):
+    year = max(dt.year, 1980)
+    date = ((year - 1980) << 9) | (dt.month << 5) | dt.day
+    time = (dt.hour << 11) | (dt.minute << 5) | (dt.second // 2)
+    return time, date
+
+
+class ZipEntry:
+    def __init__(self, arcname, storage_name, size, modified):
+        self.arcname = arcname.encode('utf-8')
+        self.storage_name = storage_name
+        self.size = size
+        self.dos_time, self.dos_date = dos_datetime(modified)
+        self.offset = 0
+        self.crc = None
+
+    @property
+    def crc_key(self):
+        digest = hashlib.sha1(f'{self.storage_name}|{self.size}'.encode()).hexdigest()
+        return f'zipcrc:{digest}'
+
+    def local_header(self):
+        return struct.pack(
+            '<IHHHHHIIIHH',
+            0x04034B50, VERSION_DEFAULT, FLAG_DATA_DESCRIPTOR | FLAG_UTF8, 0,
+            self.dos_time, self.dos_date, 0, 0, 0, len(self.arcname), 0,
+        ) + self.arcname
+
+    def data_descriptor(self):
+        return struct.pack('<IIII', 0x08074B50, self.crc, self.size, self.size)
+
+    @property
+    def length(self):
+        return 30 + len(self.arcname) + self.size + 16
+
+    def central_header(self):
+        extra = b''
+        offset = self.offset
+        # 0xFFFFFFFF itself means "see the ZIP64 field", so it needs one too
+        if offset >= ZIP64_LIMIT:
+            extra = struct.pack('<HHQ', 0x0001, 8, offset)
+            offset = ZIP64_LIMIT
+        version = VERSION_ZIP64 if extra else VERSION_DEFAULT
+        return struct.pack(
+            '<IHHHHHHIIIHHHHHII',
+            0x02014B50, version, version, FLAG_DATA_DESCRIPTOR | FLAG_UTF8, 0,
+            self.dos_time, self.dos_date, self.crc, self.size, self.size,
+            len(self.arcname), len(extra), 0, 0, 0, 0o100644 << 16, offset,
+        ) + self.arcname + extra
+
+    @property
+    def central_length(self):
+        return 46 + len(self.arcname) + (12 if self.offset >= ZIP64_LIMIT else 0)
+
+
+class ZipStream:
+    """
+    A ZIP archive of stored files with a precomputed layout. `files` is an
+    iterable of (arcname, storage name, size, modified datetime); entries
+    larger than 4 GiB are not supported.
+    """
+
+    def __init__(self, files, storage=default_storage):
+        self.storage = storage
+        self.entries = []
+        offset = 0
+        for arcname, storage_name, size, modified in files:
+            entry = ZipEntry(arcname, storage_name, size, modified)
+            entry.offset = offset
+            offset += entry.length
+            self.entries.append(entry)
+        self.central_offset = offset
+        self.central_size = sum(entry.central_length for entry in self.entries)
+        self.zip64 = (
+            self.central_offset >= ZIP64_LIMIT
+            or self.central_size >= ZIP64_LIMIT
+            or len(self.entries) >= 0xFFFF
+        )
+        self.size = self.central_offset + self.central_size + (56 + 20 if self.zip64 else 0) + 22
+
+    @property
+    def etag(self):
+        manifest = '\n'.join(
+            f'{entry.arcname.decode()}|{entry.storage_name}|{entry.size}|{entry.dos_date}|{entry.dos_time}'
+            for entry in self.entries
+        )
+        return '"%s"' % hashlib.sha1(manifest.encode()).hexdigest()
+
+    def stream(self, start=0, end=None):
+        """Yield the archive bytes in [start, end], reading files lazily."""
+        end = self.size - 1 if end is None else end
+        position = 0
+        for entry in self.entries:
+            if position + entry.length <= start:
+                # Skipped entirely; only its CRC is needed later
+                self._ensure_crc(entry)
+                position += entry.length
+                continue
+            if position > end:
+                return
+            for piece in self._entry_pieces(entry):
+                position, chunk = self._clip(position, piece, start, end)
+                if chunk:
+                    yield chunk
+                if position > end:
+                    return
+
+        for entry in self.entries:
+            self._ensure_crc(entry)
+        for piece in self._trailer_pieces():
+            position, chunk = self._clip(position, piece, start, end)
+            if chunk:
+                yield chunk
+            if position > end:
+                return
+
+    @staticmethod
+    def _clip(position, piece, start, end):
+        piece_end = position + len(piece)
+        chunk = piece[max(start - position, 0):max(min(end + 1, piece_end) - position, 0)]
+        return piece_end, chunk
+
+    def _entry_pieces(self, entry):
+        yield entry.local_header()
+        crc = 0
+        with self.storage.open(entry.storage_name, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                crc = zlib.crc32(chunk, crc)
+                yield chunk
+        entry.crc = crc
+        cache.set(entry.crc_key, crc, CRC_CACHE_TIMEOUT)
+        yield entry.data_descriptor()
+
+    def _ensure_crc(self, entry):
+        if entry.crc is not None:
+            return
+        crc = cache.get(entry.crc_key)
+        if crc is None:
+            crc = 0
+            with self.storage.open(entry.storage_name, 'rb') as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    crc = zlib.crc32(chunk, crc)
+            cache.set(entry.crc_key, crc, CRC_CACHE_TIMEOUT)
+        entry.crc = crc
+
+    def _trailer_pieces(self):
+        for entry in self.entries:
+            yield entry.central_header()
+
+        count = len(self.entries)
+        central_offset = self.central_offset
+        if self.zip64:
+            zip64_end = self.central_offset + self.central_size
+            yield struct.pack(
+                '<IQHHIIQQQQ',
+                0x06064B50, 44, VERSION_ZIP64, VERSION_ZIP64, 0, 0,
+                count, count, self.central_size, self.central_offset,
+            )
+            yield struct.pack('<IIQI', 0x07064B50, 0, zip64_end, 1)
+            count = min(count, 0xFFFF)
+            central_offset = min(central_offset, ZIP64_LIMIT)
+        yield struct.pack(
+            '<IHHHHIIH',
+            0x06054B50, 0, 0, count, count, self.central_size, central_offset, 0,
+        )
+
+
+def parse_range(header, size):
+    """
+    Parse a single `bytes=` range against a resource of `size` bytes.
+    Returns (start, end) inclusive, None for a missing or multi-range
+    header, or raises ValueError when the range can't be satisfied.
+    """
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    first, _, last = header[len('bytes='):].strip().partition('-')
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            # Suffix range: the last N bytes
+            start, end = max(size - int(last), 0), size - 1
+    except ValueError:
+        return None
+    end = min(end, size - 1)
+    if start > end or start >= size:
+        raise ValueError('Range not satisfiable')
+    return start, end